@@ -0,0 +1,128 @@
+"""
+Render benchmark: RGB vs single-channel grayscale OCR input at 300 DPI.
+
+Compares, per page of every PDF in testing_data:
+  legacy - get_pixmap(dpi=300), copy via np.frombuffer, RGB -> BGR
+  rgb    - current RGB path (zero-copy pixmap view, BGR conversion)
+  gray   - grayscale pixmap, zero-copy view, expanded to BGR once
+
+Memory is the peak of numpy allocations (tracemalloc) plus every MuPDF
+pixmap created along the way, which tracemalloc can't see. Rendering is
+forced (no embedded-scan fast path) and uncapped so every page is a true
+300 DPI rasterization. Pages that contain raster images (scans) stay on
+the RGB pixmap path in gray mode and only save the later conversion, so
+the gray savings are reported against rgb, overall and for the text and
+vector pages that take the gray pixmap path.
+
+Usage:
+    python bench_render.py [pdf_dir] [repeats]
+"""
+
+import glob
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from core.ocr_engine import prepare_image, rasterize_page
+from core.pdf_images import RenderOptions
+
+
+DPI = 300
+RGB = RenderOptions(dpi=DPI, max_side=None, use_embedded=False)
+GRAY = RenderOptions(dpi=DPI, max_side=None, use_embedded=False, grayscale=True)
+
+
+# Sizes of the pixmaps MuPDF allocates during one measured call
+_pixmap_sizes = []
+_get_pixmap = fitz.Page.get_pixmap
+
+
+def _tracked_get_pixmap(self, *args, **kwargs):
+    pix = _get_pixmap(self, *args, **kwargs)
+    _pixmap_sizes.append(pix.stride * pix.height)
+    return pix
+
+
+fitz.Page.get_pixmap = _tracked_get_pixmap
+
+
+def legacy_render(page):
+    pix = page.get_pixmap(dpi=DPI)
+    img = np.frombuffer(pix.samples, dtype=np.uint8)
+    img = img.reshape(pix.height, pix.width, pix.n)
+    return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+
+
+def current_render(page, render):
+    img, _ = rasterize_page(page, render)
+    return prepare_image(img, render)
+
+
+def measure(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    _pixmap_sizes.clear()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return statistics.median(times) * 1000, (peak + sum(_pixmap_sizes)) / 2**20
+
+
+def main(pdf_dir, repeats):
+    rows = []
+    for pdf_path in sorted(glob.glob(os.path.join(pdf_dir, "*.pdf"))):
+        doc = fitz.open(pdf_path)
+        for page in doc:
+            legacy = measure(lambda: legacy_render(page), repeats)
+            rgb = measure(lambda: current_render(page, RGB), repeats)
+            gray = measure(lambda: current_render(page, GRAY), repeats)
+            # Only pages without raster images get a gray pixmap
+            gray_path = not page.get_images()
+            rows.append((os.path.basename(pdf_path)[:28], page.number + 1, legacy, rgb, gray, gray_path))
+        doc.close()
+
+    print(f"{'document':28} {'pg':>3} | {'legacy ms':>9} {'MiB':>6} | "
+          f"{'rgb ms':>7} {'MiB':>6} | {'gray ms':>7} {'MiB':>6} | path")
+    for name, page_no, legacy, rgb, gray, gray_path in rows:
+        print(f"{name:28} {page_no:>3} | {legacy[0]:9.1f} {legacy[1]:6.1f} | "
+              f"{rgb[0]:7.1f} {rgb[1]:6.1f} | {gray[0]:7.1f} {gray[1]:6.1f} | "
+              f"{'gray' if gray_path else 'rgb'}")
+
+    if rows:
+        def mean(col, i, subset=rows):
+            return statistics.mean(r[col][i] for r in subset)
+
+        print(f"\nMean per page: legacy {mean(2, 0):.1f} ms / {mean(2, 1):.1f} MiB, "
+              f"rgb {mean(3, 0):.1f} ms / {mean(3, 1):.1f} MiB, "
+              f"gray {mean(4, 0):.1f} ms / {mean(4, 1):.1f} MiB")
+        print(f"Rgb saves {mean(2, 0) - mean(3, 0):.1f} ms and "
+              f"{mean(2, 1) - mean(3, 1):.1f} MiB per page vs legacy")
+        print(f"Gray saves {mean(3, 0) - mean(4, 0):.1f} ms and "
+              f"{mean(3, 1) - mean(4, 1):.1f} MiB per page vs rgb")
+
+        gray_rows = [r for r in rows if r[5]]
+        print(f"{len(rows) - len(gray_rows)} of {len(rows)} pages contain raster images "
+              f"(scans) and stay on the RGB pixmap path in gray mode")
+        if gray_rows:
+            print(f"On the {len(gray_rows)} text/vector pages gray saves "
+                  f"{mean(3, 0, gray_rows) - mean(4, 0, gray_rows):.1f} ms and "
+                  f"{mean(3, 1, gray_rows) - mean(4, 1, gray_rows):.1f} MiB per page vs rgb")
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    pdf_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(here, "..", "testing_data")
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    main(pdf_dir, repeats)
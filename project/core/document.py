@@ -0,0 +1,97 @@
+"""
+Document Session
+
+One open PDF shared by every extraction stage. The text layer, the OCR
+fallback and image conversion all read from the same handle instead of
+re-opening (and re-parsing) the file, and the handle is closed
+deterministically when the session ends.
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, Union
+
+import fitz  # PyMuPDF
+
+
+class DocumentSession:
+    """
+    An open PDF with cached pages and page text.
+
+    Usage:
+        with DocumentSession(pdf_path) as session:
+            pages = extract_document_text(session)
+    """
+
+    def __init__(self, pdf_path: str):
+        self.path = os.path.abspath(pdf_path)
+        self._doc = fitz.open(self.path)
+        self._pages: Dict[int, "fitz.Page"] = {}
+        self._texts: Dict[int, str] = {}
+
+    @property
+    def doc(self):
+        if self._doc is None:
+            raise ValueError(f"Document session is closed: {self.path}")
+        return self._doc
+
+    @property
+    def closed(self) -> bool:
+        return self._doc is None
+
+    def __len__(self) -> int:
+        return len(self.doc)
+
+    def page(self, page_index: int):
+        """Get a page object, loading it only once."""
+        page = self._pages.get(page_index)
+        if page is None:
+            page = self.doc[page_index]
+            self._pages[page_index] = page
+        return page
+
+    def pages(self) -> Iterator:
+        for page_index in range(len(self)):
+            yield self.page(page_index)
+
+    def page_text(self, page_index: int) -> str:
+        """Text layer of a page, extracted only once."""
+        text = self._texts.get(page_index)
+        if text is None:
+            text = self.page(page_index).get_text("text")
+            self._texts[page_index] = text
+        return text
+
+    def close(self) -> None:
+        if self._doc is not None:
+            self._pages.clear()
+            self._doc.close()
+            self._doc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+DocumentSource = Union[str, os.PathLike, DocumentSession]
+
+
+@contextmanager
+def open_document(source: DocumentSource):
+    """
+    Yield a session for `source`.
+
+    A session passed in is used as is and left open for its owner; a path
+    gets a fresh session that is closed on exit.
+    """
+    if isinstance(source, DocumentSession):
+        yield source
+        return
+
+    session = DocumentSession(source)
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,200 @@
+"""
+Adaptive DPI Policy
+
+Pages are OCR'd at the lowest resolution that reads them well. Each
+document type has a ladder of DPIs: every page starts on the first rung
+and only pages whose mean line confidence stays below the threshold are
+OCR'd again on the next one. `core.extractor.run_extraction` adds a
+document-level check on top: when required fields are still missing, the
+OCR'd pages move up the ladder as a whole.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+from core.ocr_result import OCRLines
+from core.pdf_images import RenderOptions
+
+
+@dataclass(frozen=True)
+class DPIPolicy:
+    """
+    Resolution ladder for one document type.
+
+    Attributes:
+        ladder: DPIs to try, lowest first
+        min_confidence: Pages whose mean line confidence is below this are
+            OCR'd again at the next DPI
+        required_fields: Extractor fields (keys of result["fields"]) the
+            document must yield
+        min_coverage: Share of `required_fields` that must be found before
+            the document is accepted without escalating
+        budget_dpi: DPI the render pixel budget (`max_side`) is meant for;
+            higher rungs get a proportionally larger one. Defaults to the
+            first rung.
+    """
+
+    ladder: Tuple[int, ...] = (300,)
+    min_confidence: float = 0.85
+    required_fields: Tuple[str, ...] = ()
+    min_coverage: float = 1.0
+    budget_dpi: Optional[int] = None
+
+    def escalated(self) -> Optional["DPIPolicy"]:
+        """The same policy starting one rung higher, or None at the top."""
+        if len(self.ladder) < 2:
+            return None
+        return replace(self, ladder=self.ladder[1:], budget_dpi=self.budget_dpi or self.ladder[0])
+
+    def rung_render(self, render: RenderOptions, dpi: int) -> RenderOptions:
+        """
+        Render options for the rung at `dpi`.
+
+        With a fixed pixel budget every rung above the one that fills it
+        would render the same image, so the budget grows with the DPI. In
+        tiling mode `max_side` is the tile size and stays as it is.
+        """
+        base = self.budget_dpi or self.ladder[0]
+        max_side = render.max_side
+        if max_side and not render.tile and dpi > base:
+            max_side = int(max_side * dpi / base)
+        return replace(render, dpi=dpi, max_side=max_side)
+
+
+DEFAULT_DPI_POLICY = DPIPolicy()
+
+# Large-print cards read fine at low resolution; faint, watermarked GST
+# scans need more headroom
+DPI_POLICIES: Dict[str, DPIPolicy] = {
+    "pan": DPIPolicy(ladder=(150, 225, 300), required_fields=("pan", "name")),
+    "gst": DPIPolicy(
+        ladder=(200, 300, 400),
+        required_fields=("gst_number", "name", "constitution_of_business")
+    ),
+    "udyam": DPIPolicy(ladder=(200, 300), required_fields=("udyam_number", "enterprise_name")),
+}
+
+
+def policy_for(doc_type: Union[str, DPIPolicy, None]) -> DPIPolicy:
+    """Look up the policy for a document type ("pan", "gst", "udyam")."""
+    if isinstance(doc_type, DPIPolicy):
+        return doc_type
+    if doc_type is None:
+        return DEFAULT_DPI_POLICY
+    return DPI_POLICIES.get(doc_type.lower(), DEFAULT_DPI_POLICY)
+
+
+def page_confidence(lines: OCRLines) -> float:
+    """Mean line score weighted by text length; 0.0 when nothing was read."""
+    weights = np.array([len(t.strip()) for t in lines.texts], dtype=np.float32)
+    if not weights.sum():
+        return 0.0
+    return float((lines.scores * weights).sum() / weights.sum())
+
+
+def field_coverage(result: Dict, required_fields: Iterable[str]) -> float:
+    """Share of `required_fields` the extractor filled in."""
+    required_fields = list(required_fields)
+    if not required_fields:
+        return 1.0
+    fields = result.get("fields", {}) if isinstance(result, dict) else {}
+    return sum(1 for f in required_fields if fields.get(f)) / len(required_fields)
+
+
+def iter_ladder_pages(
+    page_indices,
+    policy: DPIPolicy,
+    render: RenderOptions,
+    structured: bool,
+    run: Callable[..., Iterator[Dict]],
+    dpi_of: Optional[Callable[[int, RenderOptions], float]] = None
+) -> Iterator[Dict]:
+    """
+    OCR pages up the DPI ladder, yielding each page once it is settled.
+
+    `run(indices, render)` OCRs pages with structured output. A page is
+    settled when it reads with enough confidence or reaches the top rung;
+    if a higher rung reads worse, the better earlier reading is kept.
+    Given `dpi_of(page_index, render)`, the resolution a page would be
+    read at, a page also settles when the next rung can't resolve it any
+    finer (a scan already at its native resolution), instead of being
+    OCR'd again on the same pixels.
+
+    Yields:
+        Page dicts in page order with the DPI the page was read at under
+        "dpi"; pages whose OCR failed on every rung are left out.
+    """
+    page_indices = list(page_indices)
+    best: Dict[int, Dict] = {}
+    settled = set()
+    read_at: Dict[int, float] = {}
+
+    expected = iter(page_indices)
+    next_page = next(expected, None)
+
+    def ready():
+        nonlocal next_page
+        pages = []
+        while next_page is not None and next_page in settled:
+            page = best.pop(next_page, None)
+            if page:
+                pages.append(_strip(page, structured))
+            next_page = next(expected, None)
+        return pages
+
+    pending = page_indices
+    for rung, dpi in enumerate(policy.ladder):
+        top = rung == len(policy.ladder) - 1
+        rung_render = policy.rung_render(render, dpi)
+
+        if dpi_of is not None:
+            finer = []
+            for page_index in pending:
+                resolution = dpi_of(page_index, rung_render)
+                if page_index in best and resolution <= read_at[page_index] * 1.01:
+                    settled.add(page_index)
+                else:
+                    read_at[page_index] = resolution
+                    finer.append(page_index)
+            pending = finer
+            yield from ready()
+            if not pending:
+                break
+
+        retry = []
+        results = run(pending, rung_render)
+        try:
+            for record in results:
+                page_index = record["page"] - 1
+                record["confidence"] = round(page_confidence(record["lines"]), 4)
+
+                previous = best.get(page_index)
+                if previous is None or record["confidence"] >= previous["confidence"]:
+                    best[page_index] = record
+
+                if top or record["confidence"] >= policy.min_confidence:
+                    settled.add(page_index)
+                else:
+                    retry.append(page_index)
+
+                yield from ready()
+        finally:
+            results.close()
+
+        # Pages that failed outright on this rung get another try too
+        missing = set(pending) - settled - set(retry)
+        pending = sorted(set(retry) | missing)
+        if not pending:
+            break
+
+    settled.update(page_indices)
+    yield from ready()
+
+
+def _strip(record: Dict, structured: bool) -> Dict:
+    if not structured:
+        record.pop("lines", None)
+        record.pop("region", None)
+    return record
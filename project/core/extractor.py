@@ -26,6 +26,7 @@
 #         }
 #         for p in extract_ocr_text(pdf_path)
 #     ]
+from core.document import DocumentSource, open_document
 from core.pdf_text import extract_pdf_text
 # from core.text_normalizer import normalize_text
 import re
@@ -48,31 +49,193 @@ def is_text_usable(text: str) -> bool:
     return True
 
 
-def extract_document_text(pdf_path):
-    pdf_pages = extract_pdf_text(pdf_path)
+def iter_document_text(source: DocumentSource, pages=None, **ocr_options):
+    """
+    Yield the text of each page as soon as it is available.
 
-    usable_pages = [
-        p for p in pdf_pages
-        if is_text_usable(p.get("text", ""))
-    ]
+    Pages whose text layer passes `is_text_usable` keep it; only the
+    remaining pages are sent to OCR. Each page records its `source`
+    ("pdf" or "ocr"). `pages` limits the run to those 0-based indices.
+    `ocr_options` are passed on to `iter_ocr_text`.
 
-    if usable_pages:
-        return [
-            {
-                "page": p["page"],
-                "source": "pdf",
-                "text": p["text"]
-            }
-            for p in usable_pages
+    `source` is a path or an open DocumentSession; the PDF is opened once
+    and shared by the text-layer and OCR stages.
+    """
+    with open_document(source) as session:
+        # The text layer is cheap, so it is read up front to know which
+        # pages need OCR; OCR results are then streamed in page order.
+        pdf_pages = extract_pdf_text(session)
+        if pages is not None:
+            wanted = set(pages)
+            pdf_pages = [p for p in pdf_pages if p["page"] - 1 in wanted]
+
+        needs_ocr = [
+            p["page"] - 1 for p in pdf_pages
+            if not is_text_usable(p.get("text", ""))
         ]
 
-    # ✅ Force OCR fallback when PDF text is junk
-    from core.ocr_engine import extract_ocr_text
-    return [
-        {
-            "page": p["page"],
-            "source": "ocr",
-            "text": p["text"]
-        }
-        for p in extract_ocr_text(pdf_path)
-    ]
+        ocr_iter = iter(())
+        if needs_ocr:
+            # ✅ OCR fallback only for pages whose PDF text is junk
+            from core.ocr_engine import iter_ocr_text
+            ocr_iter = iter_ocr_text(session, pages=needs_ocr, **ocr_options)
+
+        pending = None
+        exhausted = False
+        needs_ocr = set(needs_ocr)
+
+        try:
+            for p in pdf_pages:
+                page = p
+                source_name = "pdf"
+
+                if p["page"] - 1 in needs_ocr:
+                    # Failed OCR pages are missing from ocr_iter, so advance
+                    # by page number rather than one-for-one
+                    while not exhausted and (pending is None or pending["page"] < p["page"]):
+                        pending = next(ocr_iter, None)
+                        exhausted = pending is None
+                    if pending is not None and pending["page"] == p["page"]:
+                        page = pending
+                        source_name = "ocr"
+
+                if source_name == "pdf" and not p.get("text", "").strip():
+                    continue
+
+                record = {
+                    "page": p["page"],
+                    "source": source_name,
+                    "text": page["text"]
+                }
+                # Structured OCR output (lines, region) rides along
+                for key in page.keys() - record.keys():
+                    record[key] = page[key]
+                yield record
+        finally:
+            close = getattr(ocr_iter, "close", None)
+            if close:
+                close()
+
+
+def extract_document_text(source: DocumentSource, **ocr_options):
+    """List version of `iter_document_text`."""
+    return list(iter_document_text(source, **ocr_options))
+
+
+def iter_extraction(source: DocumentSource, extract_fn, **ocr_options):
+    """
+    Run a field extractor incrementally while pages are still being read.
+
+    After each page arrives, `extract_fn` is applied to the text gathered
+    so far (pages joined with a space, as the runners always did), so
+    callers can act on partial results while later pages are still in OCR.
+
+    Yields:
+        (pages, result) with the pages consumed so far and the extractor
+        output on their text.
+    """
+    pages = []
+    raw_text = ""
+    for page in iter_document_text(source, **ocr_options):
+        pages.append(page)
+        raw_text = f"{raw_text} {page['text']}" if len(pages) > 1 else page["text"]
+        yield pages, extract_fn(raw_text)
+
+
+def _read_pages(session, extract_fn, required_fields, ocr_options):
+    """Read pages and extract; stop at the first page that completes `required_fields`."""
+    if not required_fields:
+        pages = extract_document_text(session, **ocr_options)
+        return pages, extract_fn(" ".join(page["text"] for page in pages))
+
+    from core.dpi_policy import field_coverage
+
+    pages, result = [], None
+    steps = iter_extraction(session, extract_fn, **ocr_options)
+    try:
+        for pages, result in steps:
+            if field_coverage(result, required_fields) >= 1.0:
+                break
+    finally:
+        # Closing the page stream stops OCR of the pages not needed any more
+        steps.close()
+
+    if result is None:
+        result = extract_fn("")
+    return list(pages), result
+
+
+def run_extraction(
+    source: DocumentSource,
+    extract_fn,
+    dpi_policy=None,
+    required_fields=None,
+    with_tables=False,
+    **ocr_options
+):
+    """
+    Extract fields from a document through the streaming page pipeline.
+
+    Page texts are collected as they arrive and the extractor runs once on
+    the complete text. Use `iter_extraction` for partial results.
+
+    With `required_fields` (an extractor's REQUIRED_FIELDS), pages are read
+    in order and reading stops as soon as the extractor reports all of
+    them, so later pages such as annexures are never OCR'd. Pass
+    `with_tables=True` when the tables on those pages are wanted; every
+    page is read then.
+
+    With a `dpi_policy` (see core.dpi_policy), OCR starts at the low end of
+    the document type's DPI ladder. If the extractor then finds fewer of
+    the required fields (`required_fields`, else the policy's) than the
+    policy asks for, the OCR'd pages that the next rung would read at a
+    higher resolution are OCR'd again there and extraction is repeated, until the fields are
+    found or the ladder runs out.
+
+    Returns:
+        The extractor output for the document.
+    """
+    stop_fields = None if with_tables else required_fields
+
+    if dpi_policy is None:
+        with open_document(source) as session:
+            return _read_pages(session, extract_fn, stop_fields, ocr_options)[1]
+
+    from core.dpi_policy import field_coverage, policy_for
+    from core.ocr_engine import default_render_options, effective_dpi, iter_ocr_text
+
+    policy = policy_for(dpi_policy)
+    wanted = required_fields or policy.required_fields
+
+    with open_document(source) as session:
+        pages, result = _read_pages(
+            session, extract_fn, stop_fields, dict(ocr_options, dpi_policy=policy)
+        )
+
+        while field_coverage(result, wanted) < policy.min_coverage:
+            policy = policy.escalated()
+            if policy is None:
+                break
+
+            # Only pages the next rung resolves finer than they were read
+            floor = policy.ladder[0]
+            floor_render = policy.rung_render(
+                ocr_options.get("render") or default_render_options(), floor
+            )
+            redo = [
+                page["page"] - 1 for page in pages
+                if page.get("dpi") is not None
+                and effective_dpi(session.page(page["page"] - 1), floor_render) > page["dpi"] * 1.01
+            ]
+            if not redo:
+                continue
+
+            print(f"⚠️ Required fields missing, OCR again from {floor} DPI")
+            better = {
+                page["page"]: page
+                for page in iter_ocr_text(session, pages=redo, dpi_policy=policy, **ocr_options)
+            }
+            pages = [better.get(page["page"], page) for page in pages]
+            result = extract_fn(" ".join(page["text"] for page in pages))
+
+    return result
@@ -2,6 +2,16 @@ import re
 from typing import Dict, List, Optional, Tuple, Any, Union
 
 
+# Certificate-page fields; page reading can stop once all are found
+REQUIRED_FIELDS = (
+    "gst_number",
+    "name",
+    "constitution_of_business",
+    "principal_address",
+    "particulars_of_approving_authority",
+)
+
+
 def _post_process_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
     """
     Final validation / cleaning pass on all extracted fields,
@@ -396,17 +406,22 @@ def _structure_principal_address(address: str) -> Dict[str, str]:
     return result
 
 
-def extract_gst_certificate_fields(raw_text: str) -> dict:
+def extract_gst_certificate_fields(raw_text: str, region_values: Optional[Dict[str, str]] = None) -> dict:
     """
     Extract fields from GST Certificate (Form GST REG-06).
     
     Args:
         raw_text: OCR extracted text from GST certificate
+        region_values: Optional field values read straight from their
+            regions of the form (see core.roi_ocr). Fields found there skip
+            the text heuristics; the rest are still searched in raw_text.
         
     Returns:
         Dictionary containing document_type, fields, missing_fields, and debug info
     """
-    if not raw_text or not isinstance(raw_text, str):
+    region_values = {k: v for k, v in (region_values or {}).items() if v and v.strip()}
+    raw_text = raw_text if isinstance(raw_text, str) else ""
+    if not raw_text and not region_values:
         return _empty_result()
     
     cleaned_text = _normalize_text(raw_text)
@@ -422,13 +437,26 @@ def extract_gst_certificate_fields(raw_text: str) -> dict:
         "additional_place_of_business": ""
     }
     
-    # Extract each field
-    extracted_fields["gst_number"] = _extract_gst_number(cleaned_text)
-    extracted_fields["name"] = _extract_name(cleaned_text)
-    extracted_fields["constitution_of_business"] = _extract_constitution(cleaned_text)
-    extracted_fields["principal_address"] = _extract_principal_address(cleaned_text)
-    extracted_fields["particulars_of_approving_authority"] = _extract_approving_authority(cleaned_text)
-    extracted_fields["total_no_of_additional_places"] = _extract_total_additional_places(cleaned_text)
+    extractors = {
+        "gst_number": _extract_gst_number,
+        "name": _extract_name,
+        "constitution_of_business": _extract_constitution,
+        "principal_address": _extract_principal_address,
+        "particulars_of_approving_authority": _extract_approving_authority,
+        "total_no_of_additional_places": _extract_total_additional_places,
+    }
+    
+    # Extract each field, preferring values read from their own region
+    for key, extract in extractors.items():
+        if key in region_values:
+            value = region_values[key].strip()
+            if key == "gst_number":
+                value = _extract_gst_number(value.upper())
+            elif key == "principal_address":
+                value = _clean_address(value)
+            extracted_fields[key] = value
+        if not extracted_fields[key]:
+            extracted_fields[key] = extract(cleaned_text)
     
     # Handle additional places based on total count
     total_places = extracted_fields["total_no_of_additional_places"]
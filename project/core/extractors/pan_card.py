@@ -2,6 +2,9 @@ import re
 from typing import Dict
 from core.extractor import extract_document_text
 
+# Fields that complete a PAN card; page reading can stop once all are found
+REQUIRED_FIELDS = ("pan", "name", "incorporation_date")
+
 def get_pan_holder_type(pan: str) -> str | None:
     """
     Determines PAN holder type from 4th character.
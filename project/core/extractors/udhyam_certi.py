@@ -432,6 +432,13 @@ import json
 from typing import Dict, List, Any
 
 
+# Fields printed on the first page; page reading can stop once both are
+# found, which skips the later pages. PAN, incorporation date and the
+# official address only come on pages 2 and 3, so a caller that needs them
+# (or the annexure tables) reads the whole document with with_tables=True
+REQUIRED_FIELDS = ("udyam_number", "enterprise_name")
+
+
 def extract_udyam_fields(raw_text: str) -> dict:
     """
     Extract fields and tables from Udyam Registration Certificate.
@@ -0,0 +1,221 @@
+"""
+OCR Backends
+
+Everything below `recognize` talks to the model through a small protocol:
+a batch of BGR images goes in, one OCRLines per image comes out. PaddleOCR
+is the production backend; `FakeBackend` replays recorded results (or the
+PDF text layer) so the render/extract pipeline can be profiled and
+regression-tested without the inference stack.
+
+Any function that takes an OCRConfig as `config` also accepts a backend:
+
+    backend = FakeBackend.from_text_layer("gst.pdf", delay=0.05)
+    pages = extract_ocr_text("gst.pdf", config=backend, workers=1)
+"""
+
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional, Protocol, Sequence, Union, runtime_checkable
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from core.ocr_engine import OCRConfig, default_ocr_config, get_ocr
+from core.ocr_result import OCRLines
+
+
+@runtime_checkable
+class OCRBackend(Protocol):
+    """
+    What the pipeline needs from an OCR implementation.
+
+    Backends must be picklable (the worker pool ships them to each process)
+    and have a stable repr, which is part of the OCR cache key.
+    """
+
+    def load(self) -> None:
+        """Get ready for inference (build models, open files)."""
+
+    def recognize(self, images: Sequence[np.ndarray]) -> List[Optional[OCRLines]]:
+        """One OCRLines per BGR image, in input order; None where OCR failed."""
+
+
+class PaddleBackend:
+    """PaddleOCR through the process-wide model manager."""
+
+    def __init__(self, config: Optional[OCRConfig] = None):
+        self.config = config or default_ocr_config()
+
+    def __repr__(self) -> str:
+        return f"PaddleBackend({self.config!r})"
+
+    def load(self) -> None:
+        get_ocr(self.config)
+
+    def recognize(self, images: Sequence[np.ndarray]) -> List[Optional[OCRLines]]:
+        try:
+            results = get_ocr(self.config).predict(list(images))
+        except Exception as e:
+            if len(images) == 1:
+                print("⚠️ OCR failed:", e)
+                return [None]
+            # Retry one by one so a single bad page doesn't sink the batch
+            return [self.recognize([img])[0] for img in images]
+
+        if not results or not isinstance(results, list) or len(results) != len(images):
+            return [None] * len(images)
+
+        return [OCRLines.from_paddle(page_data) for page_data in results]
+
+
+class FakeBackend:
+    """
+    Deterministic stand-in for the model.
+
+    Results are looked up by a hash of the image pixels. Images without a
+    recorded result get a single full-image line naming their size, so
+    every page still produces text. `delay` seconds are slept per image to
+    imitate inference time.
+
+    Attributes:
+        recorded: Image hash -> OCRLines.to_dict() result
+        delay: Simulated inference time per image, in seconds
+        name: Shown in the repr, and so part of the cache key
+    """
+
+    def __init__(
+        self,
+        recorded: Optional[Dict[str, Dict]] = None,
+        delay: float = 0.0,
+        name: str = "fake"
+    ):
+        self.recorded = dict(recorded or {})
+        self.delay = delay
+        self.name = name
+        self.calls = 0
+
+    def __repr__(self) -> str:
+        return f"FakeBackend({self.name!r})"
+
+    @staticmethod
+    def image_key(image: np.ndarray) -> str:
+        image = np.ascontiguousarray(image)
+        h = hashlib.sha1(f"{image.shape}|{image.dtype}".encode())
+        h.update(memoryview(image).cast("B"))
+        return h.hexdigest()
+
+    def add(self, image: np.ndarray, lines: OCRLines) -> None:
+        """Record the result to return for `image`."""
+        self.recorded[self.image_key(image)] = lines.to_dict()
+
+    def load(self) -> None:
+        pass
+
+    def recognize(self, images: Sequence[np.ndarray]) -> List[Optional[OCRLines]]:
+        self.calls += 1
+        results = []
+        for img in images:
+            if self.delay:
+                time.sleep(self.delay)
+            recorded = self.recorded.get(self.image_key(img))
+            results.append(OCRLines.from_dict(recorded) if recorded else self._placeholder(img))
+        return results
+
+    @staticmethod
+    def _placeholder(image: np.ndarray) -> OCRLines:
+        h, w = image.shape[:2]
+        poly = np.array([[[0, 0], [w, 0], [w, h], [0, h]]], dtype=np.float32)
+        return OCRLines([f"[{w}x{h}]"], np.ones(1, dtype=np.float32), poly, OCRLines.boxes_from_polys(poly))
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"name": self.name, "recorded": self.recorded}, f)
+
+    @classmethod
+    def from_file(cls, path: str, delay: float = 0.0) -> "FakeBackend":
+        """Load results written by `save` (e.g. recorded through RecordingBackend)."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["recorded"], delay=delay, name=data.get("name", "fake"))
+
+    @classmethod
+    def from_text_layer(cls, source, render=None, delay: float = 0.0) -> "FakeBackend":
+        """
+        Serve a born-digital PDF's own text layer as OCR output.
+
+        Every page is rendered exactly as the OCR path renders it with
+        `render`, and the text-layer lines are mapped into that image's
+        pixels. Pages then have to be OCR'd with the same render options
+        (e.g. a page filter that forces OCR) for the hashes to match.
+        """
+        from core.document import open_document
+        from core.ocr_engine import render_page
+
+        backend = cls(delay=delay, name="text-layer")
+        with open_document(source) as session:
+            for page in session.pages():
+                img, rect = render_page(page, render)
+                h, w = img.shape[:2]
+                lines = text_layer_lines(page)
+                backend.add(img, lines.mapped(w / rect.width, h / rect.height,
+                                              -rect.x0 * w / rect.width, -rect.y0 * h / rect.height))
+        return backend
+
+
+class RecordingBackend:
+    """
+    Pass-through backend that records what another backend returns.
+
+    Recording happens in the process that runs inference, so record
+    through an in-process path (workers=1), not the worker pool.
+
+    Usage:
+        recorder = RecordingBackend(PaddleBackend())
+        extract_ocr_text(pdf_path, config=recorder)
+        recorder.fake.save("gst_recorded.json")
+    """
+
+    def __init__(self, backend: OCRBackend, name: str = "recorded"):
+        self.backend = backend
+        self.fake = FakeBackend(name=name)
+
+    def __repr__(self) -> str:
+        # Cache hits would bypass the recording, so the key must differ
+        return f"RecordingBackend({self.backend!r})"
+
+    def load(self) -> None:
+        self.backend.load()
+
+    def recognize(self, images: Sequence[np.ndarray]) -> List[Optional[OCRLines]]:
+        results = self.backend.recognize(images)
+        for img, lines in zip(images, results):
+            if lines is not None:
+                self.fake.add(img, lines)
+        return results
+
+
+def text_layer_lines(page) -> OCRLines:
+    """Text-layer lines of a page as OCRLines in displayed page points."""
+    texts, polys = [], []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if not text:
+                continue
+            # Text coordinates are unrotated; map them onto the displayed page
+            rect = fitz.Rect(line["bbox"]) * page.rotation_matrix
+            texts.append(text)
+            polys.append([[rect.x0, rect.y0], [rect.x1, rect.y0], [rect.x1, rect.y1], [rect.x0, rect.y1]])
+
+    if not texts:
+        return OCRLines()
+    polys = np.asarray(polys, dtype=np.float32)
+    return OCRLines(texts, np.ones(len(texts), dtype=np.float32), polys, OCRLines.boxes_from_polys(polys))
+
+
+def get_backend(config: Union[OCRConfig, OCRBackend, None] = None) -> OCRBackend:
+    """Resolve a `config` argument: backends pass through, configs mean PaddleOCR."""
+    if config is None or isinstance(config, OCRConfig):
+        return PaddleBackend(config)
+    return config
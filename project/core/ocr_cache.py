@@ -0,0 +1,195 @@
+"""
+OCR Result Cache
+
+Content-addressed, on-disk cache of per-page OCR results. Entries are keyed
+by a hash of the rendered page pixels together with the OCR configuration,
+so an unchanged page of a resubmitted document never reaches the model.
+
+Storage is a single SQLite file; once the stored payload exceeds the size
+budget the least recently used entries are evicted.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+# Bump when the stored payload layout changes so stale entries stop matching
+CACHE_VERSION = 2
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Cache directory, overridable through the OCR_CACHE_DIR env variable."""
+    return os.environ.get(
+        "OCR_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "ocr-automation")
+    )
+
+
+class OCRCache:
+    """
+    Persistent LRU cache of OCR results.
+
+    Usage:
+        cache = OCRCache()
+        pages = extract_ocr_text(pdf_path, cache=cache)
+        print(cache.stats())
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path or os.path.join(default_cache_dir(), "ocr_cache.sqlite")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    # Connections can't be pickled; worker processes reopen the file lazily
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(image: np.ndarray, config) -> str:
+        """Hash the page pixels together with the OCR configuration."""
+        image = np.ascontiguousarray(image)
+        h = hashlib.sha256()
+        h.update(f"v{CACHE_VERSION}|{image.shape}|{image.dtype}|{config!r}".encode())
+        h.update(memoryview(image).cast("B"))
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Look up a result, refreshing its LRU position on a hit."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?",
+                (time.time(), key)
+            )
+            conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict) -> None:
+        """Store a result and evict least recently used entries if over budget."""
+        blob = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time())
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def counts(self) -> Tuple[int, int, int]:
+        """(hits, misses, evictions) counted by this instance so far."""
+        return self.hits, self.misses, self.evictions
+
+    def add_counts(self, hits: int = 0, misses: int = 0, evictions: int = 0) -> None:
+        """Add lookups counted by another copy, e.g. in a worker process."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def stats(self) -> Dict:
+        """
+        Hit/miss counters plus current cache size.
+
+        Counters cover this instance and, when it was handed to an
+        OCRWorkerPool, the lookups its workers made on their copies.
+        """
+        with self._lock:
+            conn = self._connect()
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
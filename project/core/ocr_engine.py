@@ -1,15 +1,281 @@
-from paddleocr import PaddleOCR
-import fitz  # PyMuPDF
+"""
+OCR Engine
+
+Renders PDF pages and runs them through PaddleOCR. Models are built lazily
+by a process-wide manager, so importing this module costs nothing until a
+page is actually recognized. Inference goes through the backend protocol in
+core.ocr_backend, so wherever `config` is taken a backend can stand in.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
 import cv2
 import numpy as np
 
-ocr = PaddleOCR(
-    lang="en",
-    use_textline_orientation=False,
-    use_doc_orientation_classify=False,
-    use_doc_unwarping=False
+from core.document import DocumentSource, open_document
+from core.ocr_result import OCRLines
+from core.pdf_images import DEFAULT_RENDER_OPTIONS, RenderOptions, page_region_image, single_scan_info
+
+
+@dataclass(frozen=True)
+class OCRConfig:
+    """
+    PaddleOCR construction settings.
+
+    Instances are hashable and double as the key under which the model
+    manager keeps its built models, so two equal configs share one model.
+
+    Attributes:
+        lang: Recognition language
+        use_textline_orientation: Run the text-line orientation classifier
+        use_doc_orientation_classify: Run the document orientation classifier
+        use_doc_unwarping: Run the document unwarping model
+        cpu_threads: Intra-op threads used for CPU inference (None = Paddle default)
+        enable_mkldnn: Use oneDNN kernels on CPU (None = Paddle default)
+        rec_batch_size: Text-line crops per recognition batch (None = Paddle default)
+    """
+
+    lang: str = "en"
+    use_textline_orientation: bool = False
+    use_doc_orientation_classify: bool = False
+    use_doc_unwarping: bool = False
+    cpu_threads: Optional[int] = None
+    enable_mkldnn: Optional[bool] = None
+    rec_batch_size: Optional[int] = None
+
+    def to_kwargs(self) -> Dict:
+        """Keyword arguments for the PaddleOCR constructor."""
+        kwargs = {
+            "lang": self.lang,
+            "use_textline_orientation": self.use_textline_orientation,
+            "use_doc_orientation_classify": self.use_doc_orientation_classify,
+            "use_doc_unwarping": self.use_doc_unwarping,
+        }
+        if self.cpu_threads is not None:
+            kwargs["cpu_threads"] = self.cpu_threads
+        if self.enable_mkldnn is not None:
+            kwargs["enable_mkldnn"] = self.enable_mkldnn
+        if self.rec_batch_size is not None:
+            kwargs["text_recognition_batch_size"] = self.rec_batch_size
+        return kwargs
+
+
+DEFAULT_OCR_CONFIG = OCRConfig()
+
+
+def default_ocr_config() -> OCRConfig:
+    """DEFAULT_OCR_CONFIG, or the host's tuned config once `tune_ocr.py` has run."""
+    from core.ocr_tuning import tuned_settings
+    settings = tuned_settings()
+    return settings.config if settings else DEFAULT_OCR_CONFIG
+
+
+def default_render_options() -> RenderOptions:
+    """DEFAULT_RENDER_OPTIONS with the host's tuned render size, if any."""
+    from core.ocr_tuning import tuned_settings
+    settings = tuned_settings()
+    if settings is None or settings.max_side == DEFAULT_RENDER_OPTIONS.max_side:
+        return DEFAULT_RENDER_OPTIONS
+    return replace(DEFAULT_RENDER_OPTIONS, max_side=settings.max_side)
+
+
+class OCRModelManager:
+    """
+    Process-wide registry of PaddleOCR instances.
+
+    A model is constructed the first time its config is requested and then
+    reused for the lifetime of the process. Several configs can be loaded
+    side by side. Without a config the host's tuned config is used
+    (see core.ocr_tuning).
+
+    A built model is not yet fast: its first inference calls pay for kernel
+    selection and allocator growth. `warm_up` runs those on synthetic pages
+    and then marks the config ready, which callers can poll (`is_ready`),
+    block on (`wait_ready`) or subscribe to (`on_ready`).
+
+    Usage:
+        manager = get_model_manager()
+        ocr = manager.get(OCRConfig(lang="en", cpu_threads=4))
+    """
+
+    def __init__(self):
+        self._models: Dict[OCRConfig, object] = {}
+        self._lock = threading.Lock()
+        # Readiness per config (or backend), with callbacks still to fire
+        self._ready: Dict[object, threading.Event] = {}
+        self._ready_callbacks: Dict[object, List[Callable]] = {}
+        self._ready_lock = threading.Lock()
+
+    def get(self, config: Optional[OCRConfig] = None):
+        """Return the model for `config`, building it on first use."""
+        config = config or default_ocr_config()
+
+        model = self._models.get(config)
+        if model is not None:
+            return model
+
+        with self._lock:
+            # Another thread may have finished the build while we waited
+            model = self._models.get(config)
+            if model is None:
+                model = self._build(config)
+                self._models[config] = model
+        return model
+
+    def is_loaded(self, config: Optional[OCRConfig] = None) -> bool:
+        """Check whether the model for `config` has already been built."""
+        return (config or default_ocr_config()) in self._models
+
+    def loaded_configs(self):
+        """Configs whose models are currently resident."""
+        return list(self._models)
+
+    def unload(self, config: Optional[OCRConfig] = None) -> None:
+        """Drop a model so its memory can be reclaimed."""
+        config = config or default_ocr_config()
+        with self._lock:
+            self._models.pop(config, None)
+        with self._ready_lock:
+            self._ready.pop(config, None)
+
+    def _ready_event(self, config) -> threading.Event:
+        with self._ready_lock:
+            return self._ready.setdefault(config or default_ocr_config(), threading.Event())
+
+    def is_ready(self, config: Optional[OCRConfig] = None) -> bool:
+        """Check whether `config` has been warmed up."""
+        return self._ready_event(config).is_set()
+
+    def wait_ready(self, config: Optional[OCRConfig] = None, timeout: Optional[float] = None) -> bool:
+        """Block until `config` is warmed up; False if `timeout` ran out first."""
+        return self._ready_event(config).wait(timeout)
+
+    def on_ready(self, callback: Callable, config: Optional[OCRConfig] = None) -> None:
+        """Call `callback(config)` once `config` is warm (right away if it already is)."""
+        config = config or default_ocr_config()
+        event = self._ready_event(config)
+        with self._ready_lock:
+            if not event.is_set():
+                self._ready_callbacks.setdefault(config, []).append(callback)
+                return
+        callback(config)
+
+    def mark_ready(self, config: Optional[OCRConfig] = None) -> None:
+        config = config or default_ocr_config()
+        event = self._ready_event(config)
+        with self._ready_lock:
+            event.set()
+            callbacks = self._ready_callbacks.pop(config, [])
+        for callback in callbacks:
+            callback(config)
+
+    @staticmethod
+    def _build(config: OCRConfig):
+        # Importing paddleocr pulls in the whole inference stack, so it is
+        # deferred until a model is really needed.
+        from paddleocr import PaddleOCR
+        return PaddleOCR(**config.to_kwargs())
+
+
+_manager = OCRModelManager()
+
+
+def get_model_manager() -> OCRModelManager:
+    """Get the process-wide model manager."""
+    return _manager
+
+
+def get_ocr(config: Optional[OCRConfig] = None):
+    """Shortcut for `get_model_manager().get(config)`."""
+    return _manager.get(config)
+
+
+# Lines of the synthetic warm-up pages: typical field labels and values, so
+# recognition sees both short and long crops
+_WARM_UP_LINES = (
+    "GOVERNMENT OF INDIA",
+    "Registration Number : 24ABCDE1234F1Z5",
+    "Legal Name M/S EXAMPLE ENTERPRISES PRIVATE LIMITED",
+    "Permanent Account Number ABCDE1234F",
+    "UDYAM-GJ-01-0012345",
+    "Date of Issue 01/04/2021",
+    "Address 12, Industrial Estate, Ahmedabad, Gujarat 380015",
 )
 
+
+def warm_up_images(render: Optional[RenderOptions] = None) -> List[np.ndarray]:
+    """
+    Synthetic BGR pages the size real ones come out of `render`.
+
+    A4 portrait and landscape at the render DPI and pixel budget, with the
+    sample lines printed at a few text heights.
+    """
+    render = render or default_render_options()
+    images = []
+    for w_pt, h_pt in ((595, 842), (842, 595)):
+        zoom = render.dpi / 72
+        if render.max_side and max(w_pt, h_pt) * zoom > render.max_side:
+            zoom = render.max_side / max(w_pt, h_pt)
+        w, h = int(w_pt * zoom), int(h_pt * zoom)
+
+        img = np.full((h, w, 3), 255, dtype=np.uint8)
+        y = 0
+        for i, line in enumerate(_WARM_UP_LINES):
+            # Body text to headings: roughly 8 to 16 pt at this zoom
+            scale = zoom * (0.35 + 0.12 * (i % 3))
+            thickness = max(1, int(round(scale * 2)))
+            (tw, th), _ = cv2.getTextSize(line, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+            y += int(th * 2.2)
+            if y >= h:
+                break
+            x = max(0, min(int(w * 0.06), w - tw))
+            cv2.putText(img, line, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), thickness, cv2.LINE_AA)
+        images.append(img)
+    return images
+
+
+def warm_up(
+    config: Optional[OCRConfig] = None,
+    render: Optional[RenderOptions] = None,
+    force: bool = False
+) -> float:
+    """
+    Get the model hot before the first real document arrives.
+
+    Builds the model and runs the `warm_up_images` through detection and
+    recognition, then marks `config` ready in the model manager (firing any
+    `on_ready` callbacks). Does nothing for a config that is already ready
+    unless `force` is set.
+
+    Args:
+        config: Model configuration or OCR backend to warm
+        render: Render settings real pages will use, which size the
+            synthetic ones
+
+    Returns:
+        Seconds spent warming up.
+    """
+    from core.ocr_backend import get_backend
+
+    config = config or default_ocr_config()
+    if not force and _manager.is_ready(config):
+        return 0.0
+
+    start = time.perf_counter()
+    backend = get_backend(config)
+    backend.load()
+    for img in warm_up_images(render):
+        backend.recognize([img])
+    elapsed = time.perf_counter() - start
+
+    _manager.mark_ready(config)
+    return elapsed
+
+
 def safe_resize(img, max_side=2500):
     h, w = img.shape[:2]
     scale = min(max_side / h, max_side / w, 1.0)
@@ -23,48 +289,478 @@ def safe_resize(img, max_side=2500):
     return img
 
 
-def extract_ocr_text(pdf_path):
-    doc = fitz.open(pdf_path)
-    pages = []
+def _pixel_budget(render: RenderOptions) -> Optional[int]:
+    # Tiling keeps full resolution; max_side then bounds the tiles instead
+    return None if render.tile else render.max_side
+
+
+def effective_dpi(page, render: Optional[RenderOptions] = None) -> float:
+    """
+    Resolution `page` is read at under `render`, without rendering it.
+
+    Below `render.dpi` when the pixel budget or the native resolution of
+    an embedded scan caps the image. Content cropping is not accounted for.
+    """
+    render = render or default_render_options()
+    longest = max(page.rect.width, page.rect.height)
+
+    side = longest * render.dpi / 72
+    budget = _pixel_budget(render)
+    if budget:
+        side = min(side, budget)
+    if render.use_embedded:
+        info = single_scan_info(page)
+        if info is not None:
+            side = min(side, max(info["width"], info["height"]))
+    return side * 72 / longest
+
+
+def rasterize_page(page, render: Optional[RenderOptions] = None):
+    """
+    The PyMuPDF part of rendering: an RGB (or gray) image of the page.
+
+    Single-image scans are decoded directly; everything else is rendered
+    with PyMuPDF (NO poppler), already at the pixel budget so nothing is
+    rasterized only to be thrown away. With `render.crop` only the content
+    region is rasterized. In tiling mode the pixel budget is left to the
+    tiles and the page is rasterized at the full DPI.
+
+    Returns:
+        (image, rect): rect is the part of the page, in displayed page
+        points, that the image covers.
+    """
+    render = render or default_render_options()
+    return page_region_image(
+        page, render.dpi, _pixel_budget(render), render.use_embedded, render.grayscale,
+        render.crop, render.crop_margin
+    )
 
-    for page_index in range(len(doc)):
-        page = doc[page_index]
 
-        # Render page to image using PyMuPDF (NO poppler)
-        pix = page.get_pixmap(dpi=300)
-        img = np.frombuffer(pix.samples, dtype=np.uint8)
-        img = img.reshape(pix.height, pix.width, pix.n)
+def prepare_image(img, render: Optional[RenderOptions] = None, rect=None):
+    """
+    Turn a rasterized RGB or gray page into the BGR image the model expects.
 
-        if pix.n == 4:  # RGBA → BGR
-            img = cv2.cvtColor(img, cv2.COLOR_RGBA2BGR)
-        else:
-            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    Resizing happens first, so the colour conversion (and for gray pages
+    the expansion to three channels) runs once at the final size. Given
+    `rect`, the page area the image covers, scans decoded at more than
+    `render.dpi` are brought down to it too.
+    """
+    render = render or default_render_options()
 
-        img = safe_resize(img)
+    max_side = _pixel_budget(render)
+    if rect is not None:
+        # One pixel of slack so rendered pages aren't resampled for rounding
+        dpi_side = int(max(rect.width, rect.height) * render.dpi / 72) + 1
+        max_side = min(max_side, dpi_side) if max_side else dpi_side
 
-        try:
-            result = ocr.ocr(img)
-        except Exception as e:
-            print("⚠️ OCR failed:", e)
+    if max_side:
+        # Caps native-resolution scans; for rendered pages it only guards
+        # against off-by-one rounding of the pixmap size
+        img = safe_resize(img, max_side)
+
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+
+
+def render_page(page, render: Optional[RenderOptions] = None):
+    """
+    Render a PDF page to a BGR image ready for OCR.
+
+    Returns:
+        (image, rect) as for `rasterize_page`.
+    """
+    img, rect = rasterize_page(page, render)
+    return prepare_image(img, render, rect), rect
+
+
+def recognize_pages(images, config=None, cache=None, render: Optional[RenderOptions] = None):
+    """`recognize` for rendered pages, tiling oversized ones if `render.tile` is set."""
+    render = render or default_render_options()
+    if render.tile and render.max_side:
+        from core.ocr_tiling import recognize_tiled
+        return recognize_tiled(images, config, cache, render.max_side, render.tile_overlap)
+    return recognize(images, config, cache)
+
+
+def recognize(images, config: Optional[OCRConfig] = None, cache=None) -> List[Optional[OCRLines]]:
+    """
+    Run detection and recognition on a batch of page images in one call.
+
+    Args:
+        images: BGR page images
+        config: Model configuration, or an OCR backend (see core.ocr_backend)
+        cache: Optional OCRCache; pages found there skip inference entirely
+
+    Returns:
+        One OCRLines per input image, in input order, with every line the
+        model produced (no score filtering). An entry is None when OCR
+        failed for that image.
+    """
+    if not images:
+        return []
+
+    config = config or default_ocr_config()
+    results = [None] * len(images)
+    pending = list(range(len(images)))
+    keys = {}
+
+    if cache is not None:
+        pending = []
+        for i, img in enumerate(images):
+            keys[i] = cache.make_key(img, config)
+            cached = cache.get(keys[i])
+            if cached is None:
+                pending.append(i)
+            else:
+                results[i] = OCRLines.from_dict(cached)
+
+    if pending:
+        from core.ocr_backend import get_backend
+        fresh = get_backend(config).recognize([images[i] for i in pending])
+        for i, result in zip(pending, fresh):
+            results[i] = result
+            if cache is not None and result is not None:
+                cache.put(keys[i], result.to_dict())
+
+    return results
+
+
+def refine_page_lines(page, lines, img, rect, config=None, cache=None, refine=None, lock=None):
+    """
+    Apply the selective re-OCR pass (core.ocr_refine) when `refine` is set.
+
+    `refine` is a RefineOptions, or True for the defaults.
+
+    Returns:
+        (lines, replaced) as for `core.ocr_refine.refine_lines`.
+    """
+    if not refine or lines is None:
+        return lines, 0
+
+    from core.ocr_refine import refine_lines
+
+    options = None if refine is True else refine
+    return refine_lines(page, lines, img, rect, config, cache, options, lock)
+
+
+def page_record(
+    page_index,
+    lines: OCRLines,
+    img,
+    rect,
+    structured=False,
+    min_score=0.25,
+    refined=None
+):
+    record = {
+        "page": page_index + 1,
+        "source": "ocr",
+        "text": lines.text(min_score)
+    }
+    if refined is not None:
+        record["refined"] = refined
+    if structured:
+        # Weak lines are kept here (with their scores) so callers can
+        # decide for themselves; only the text uses the score filter.
+        # Coordinates go from OCR-image pixels (of a possibly cropped,
+        # resized page) back to page points.
+        h, w = img.shape[:2]
+        record["lines"] = lines.filter(min_score=-1.0).mapped(
+            rect.width / w, rect.height / h, rect.x0, rect.y0
+        )
+        record["region"] = tuple(rect)
+        # What the image actually resolves, after any pixel budget
+        record["dpi"] = int(round(72 * w / rect.width))
+    return record
+
+
+def ocr_page(
+    session,
+    page_index,
+    config: Optional[OCRConfig] = None,
+    cache=None,
+    render: Optional[RenderOptions] = None,
+    structured: bool = False,
+    refine=None
+):
+    """
+    OCR a single page of an open DocumentSession.
+
+    Returns:
+        Page dict with page, source and text keys (plus lines and
+        region when `structured`, refined when `refine`), or None if OCR
+        failed.
+    """
+    page = session.page(page_index)
+    img, rect = render_page(page, render)
+    lines = recognize_pages([img], config, cache, render)[0]
+    if lines is None:
+        return None
+
+    lines, refined = refine_page_lines(page, lines, img, rect, config, cache, refine)
+    return page_record(
+        page_index, lines, img, rect, structured, refined=refined if refine else None
+    )
+
+
+def ocr_pages_batched(
+    session,
+    page_indices,
+    config: Optional[OCRConfig] = None,
+    batch_size: int = 4,
+    cache=None,
+    render: Optional[RenderOptions] = None,
+    structured: bool = False,
+    refine=None
+):
+    """
+    OCR pages in groups of `batch_size`, one inference call per group.
+
+    Peak memory grows with the batch size since a whole group of rendered
+    pages is held at once.
+
+    Yields:
+        Page dicts in page order; failed pages are left out.
+    """
+    page_indices = list(page_indices)
+
+    for start in range(0, len(page_indices), batch_size):
+        group = page_indices[start:start + batch_size]
+        rendered = [render_page(session.page(i), render) for i in group]
+
+        results = recognize_pages([img for img, _ in rendered], config, cache, render)
+        for page_index, (img, rect), lines in zip(group, rendered, results):
+            if lines is None:
+                continue
+            lines, refined = refine_page_lines(
+                session.page(page_index), lines, img, rect, config, cache, refine
+            )
+            yield page_record(
+                page_index, lines, img, rect, structured, refined=refined if refine else None
+            )
+
+
+def _run_pages(
+    session,
+    page_indices,
+    config,
+    workers,
+    batch_size,
+    cache,
+    render,
+    structured,
+    pipeline_depth,
+    render_threads,
+    timings,
+    refine
+) -> Iterator[Dict]:
+    if workers and workers > 1:
+        from core.ocr_pool import OCRWorkerPool
+
+        pool = OCRWorkerPool(
+            workers=workers,
+            config=config,
+            cache=cache,
+            render=render,
+            structured=structured,
+            refine=refine
+        )
+        with pool:
+            for page in pool.map_pages(session.path, page_indices):
+                if page:
+                    yield page
+        return
+
+    if pipeline_depth > 0:
+        from core.ocr_pipeline import ocr_pages_pipelined
+
+        yield from ocr_pages_pipelined(
+            session,
+            page_indices,
+            config=config,
+            cache=cache,
+            render=render,
+            structured=structured,
+            queue_depth=pipeline_depth,
+            render_threads=render_threads,
+            batch_size=batch_size,
+            timings=timings,
+            refine=refine
+        )
+        return
+
+    if batch_size > 1:
+        yield from ocr_pages_batched(
+            session, page_indices, config, batch_size, cache, render, structured, refine
+        )
+        return
+
+    for page_index in page_indices:
+        page = ocr_page(session, page_index, config, cache, render, structured, refine)
+        if page:
+            yield page
+
+
+def _run_filtered_pages(session, page_indices, page_filter, run) -> Iterator[Dict]:
+    """
+    Classify pages first, OCR only the ones that need it, and fill blank and
+    duplicate pages back in so the output stays in page order.
+    """
+    verdicts = {i: page_filter.classify(session, i) for i in page_indices}
+    work = [i for i in page_indices if verdicts[i].kind == "ocr"]
+
+    results = run(work)
+    try:
+        yield from _merge_filtered(page_indices, verdicts, page_filter, session, results)
+    finally:
+        results.close()
+
+
+def _merge_filtered(page_indices, verdicts, page_filter, session, results):
+    pending = None
+    exhausted = False
+
+    for page_index in page_indices:
+        verdict = verdicts[page_index]
+
+        if verdict.kind == "blank":
+            yield {
+                "page": page_index + 1,
+                "source": "ocr",
+                "text": "",
+                "skipped": "blank"
+            }
             continue
 
-        if not result or not isinstance(result, list):
+        if verdict.kind == "duplicate":
+            original = page_filter.lookup(verdict.duplicate_of)
+            if original is not None:
+                record = dict(original)
+                record["page"] = page_index + 1
+                record["skipped"] = "duplicate"
+                record["duplicate_of"] = {
+                    "document": os.path.basename(verdict.duplicate_of[0]),
+                    "page": verdict.duplicate_of[1] + 1
+                }
+                yield record
             continue
 
-        page_data = result[0]
-        texts = page_data.get("rec_texts", [])
-        scores = page_data.get("rec_scores", [])
+        # Failed pages are missing from `results`, so match on page number
+        while not exhausted and (pending is None or pending["page"] < page_index + 1):
+            pending = next(results, None)
+            exhausted = pending is None
+        if pending is not None and pending["page"] == page_index + 1:
+            page_filter.store(session, page_index, pending)
+            yield pending
+
+
+def iter_ocr_text(
+    source: DocumentSource,
+    pages: Optional[Iterable[int]] = None,
+    config: Optional[OCRConfig] = None,
+    workers: int = 0,
+    batch_size: int = 1,
+    cache=None,
+    render: Optional[RenderOptions] = None,
+    structured: bool = False,
+    pipeline_depth: int = 0,
+    render_threads: int = 1,
+    timings=None,
+    page_filter=None,
+    refine=None,
+    dpi_policy=None
+) -> Iterator[Dict]:
+    """
+    OCR the pages of a PDF, yielding each page as soon as it is ready.
+
+    Pages come out in page order; pages whose OCR failed are skipped.
+    Closing the generator early stops any remaining OCR work.
+
+    Args:
+        source: Path to the PDF, or an open DocumentSession
+        pages: 0-based indices of the pages to OCR (default: every page)
+        config: Model configuration (defaults to the host's tuned config) or an
+            OCR backend
+        workers: When > 1, pages are spread over that many worker processes,
+            each holding its own long-lived model.
+        batch_size: When > 1, pages are sent to the model in groups of this
+            size instead of one call per page.
+        cache: Optional core.ocr_cache.OCRCache. Pages whose rendered pixels
+            and config were seen before are answered from the cache.
+        render: Rasterization settings (DPI, pixel budget, content cropping)
+        structured: Also return each page's recognized lines as an OCRLines
+            (texts, boxes, polygons and scores) under "lines". Coordinates
+            are page points in displayed orientation, whatever the render
+            resolution or crop; "region" holds the (x0, y0, x1, y1) part of
+            the page that was OCR'd, and "dpi" the resolution the image
+            actually had.
+        pipeline_depth: When > 0, render threads fill a queue of at most this
+            many ready images while inference consumes it, so rendering
+            overlaps with the model. Combines with batch_size.
+        render_threads: Number of render threads in pipelined mode
+        timings: Optional core.ocr_pipeline.StageTimings that the pipelined
+            mode fills with per-stage timing
+        page_filter: Optional core.page_filter.PageFilter (or True for a
+            fresh one). Blank pages are returned empty with "skipped": "blank"
+            and near-duplicates reuse the earlier page's result with
+            "skipped": "duplicate"; neither goes through the model.
+        refine: Optional core.ocr_refine.RefineOptions (or True for the
+            defaults). Lines the model was unsure about are re-rendered at
+            a higher DPI and recognized again, and the better reading is
+            kept; each page reports the number of replaced lines under
+            "refined".
+        dpi_policy: Optional core.dpi_policy.DPIPolicy, or a document type
+            ("pan", "gst", "udyam") naming one. Pages start at the lowest
+            DPI of its ladder and only pages read with low confidence are
+            OCR'd again higher up; each page records the "dpi" it was
+            read at and its "confidence". Replaces `render.dpi`, and
+            raises `render.max_side` with it on the higher rungs.
+    """
+    with open_document(source) as session:
+        page_indices = range(len(session)) if pages is None else sorted(set(pages))
+
+        def run_at(indices, page_render, page_structured):
+            return _run_pages(
+                session, indices, config, workers, batch_size, cache, page_render,
+                page_structured, pipeline_depth, render_threads, timings, refine
+            )
+
+        def run(indices):
+            if dpi_policy is None:
+                return run_at(indices, render, structured)
+
+            from core.dpi_policy import iter_ladder_pages, policy_for
+
+            # Confidence needs the line scores, so the ladder always asks
+            # for structured output and drops it again if not wanted
+            return iter_ladder_pages(
+                indices,
+                policy_for(dpi_policy),
+                render or default_render_options(),
+                structured,
+                lambda idx, page_render: run_at(idx, page_render, True),
+                lambda page_index, page_render: effective_dpi(session.page(page_index), page_render)
+            )
+
+        if not page_filter:
+            yield from run(page_indices)
+            return
+
+        if page_filter is True:
+            from core.page_filter import PageFilter
+            page_filter = PageFilter()
+
+        yield from _run_filtered_pages(session, list(page_indices), page_filter, run)
+
 
-        lines = []
-        for i, txt in enumerate(texts):
-            score = scores[i] if i < len(scores) else 1.0
-            if score > 0.25 and txt.strip():
-                lines.append(txt)
+def extract_ocr_text(source: DocumentSource, pages: Optional[Iterable[int]] = None, **options):
+    """
+    OCR the pages of a PDF.
 
-        pages.append({
-            "page": page_index + 1,
-            "source": "ocr",
-            "text": "\n".join(lines)
-        })
+    Takes the same arguments as `iter_ocr_text`.
 
-    return pages
+    Returns:
+        List of page dicts with page, source and text keys.
+    """
+    return list(iter_ocr_text(source, pages, **options))
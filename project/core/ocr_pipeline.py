@@ -0,0 +1,208 @@
+"""
+Pipelined OCR
+
+Overlaps page rendering with inference. Render threads turn pages into
+images and push them onto a bounded queue; the consumer runs the model on
+whatever is ready. Paddle inference releases the GIL, so rendering of the
+next pages proceeds while the current one is recognized, and the queue
+bound keeps memory flat on long PDFs.
+
+PyMuPDF is not thread-safe, so the PyMuPDF part of rendering is serialized
+behind a lock; colour conversion and resizing run in parallel.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+
+from core.ocr_engine import (
+    OCRConfig,
+    page_record,
+    prepare_image,
+    rasterize_page,
+    recognize_pages,
+    refine_page_lines
+)
+from core.pdf_images import RenderOptions
+
+
+# Serializes PyMuPDF calls across render threads
+_FITZ_LOCK = threading.Lock()
+
+_DONE = object()
+
+
+@dataclass
+class StageTimings:
+    """
+    Per-stage timing of one pipelined run, in seconds.
+
+    Attributes:
+        render_s: Time spent rendering, summed over render threads
+        infer_s: Time spent in the model
+        queue_wait_s: Time inference sat waiting for a rendered page; this
+            is the render cost that was *not* hidden behind inference
+        wall_s: End-to-end time
+        pages: Pages that went through the pipeline
+    """
+
+    render_s: float = 0.0
+    infer_s: float = 0.0
+    queue_wait_s: float = 0.0
+    wall_s: float = 0.0
+    pages: int = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "render_s": round(self.render_s, 4),
+            "infer_s": round(self.infer_s, 4),
+            "queue_wait_s": round(self.queue_wait_s, 4),
+            "wall_s": round(self.wall_s, 4),
+            "pages": self.pages
+        }
+
+
+def _render_worker(session, next_index, ready, stop, render, timings, timings_lock):
+    while not stop.is_set():
+        page_index = next_index()
+        if page_index is None:
+            break
+
+        start = time.perf_counter()
+        try:
+            with _FITZ_LOCK:
+                rgb, rect = rasterize_page(session.page(page_index), render)
+            item = (page_index, (prepare_image(rgb, render, rect), rect), None)
+        except Exception as e:
+            item = (page_index, None, e)
+        with timings_lock:
+            timings.render_s += time.perf_counter() - start
+
+        # Bounded put that still notices when the consumer goes away
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+
+    ready.put(_DONE)
+
+
+def ocr_pages_pipelined(
+    session,
+    page_indices,
+    config: Optional[OCRConfig] = None,
+    cache=None,
+    render: Optional[RenderOptions] = None,
+    structured: bool = False,
+    queue_depth: int = 2,
+    render_threads: int = 1,
+    batch_size: int = 1,
+    timings: Optional[StageTimings] = None,
+    refine=None
+) -> Iterator[Dict]:
+    """
+    OCR pages with rendering and inference running concurrently.
+
+    At most `queue_depth` rendered images wait in the queue (plus one in
+    flight per render thread). Pages are recognized as they arrive, up to
+    `batch_size` at a time, and yielded in page order.
+
+    Yields:
+        Page dicts in page order; failed pages are left out.
+    """
+    timings = timings if timings is not None else StageTimings()
+    wall_start = time.perf_counter()
+
+    page_indices = list(page_indices)
+    index_iter = iter(page_indices)
+    index_lock = threading.Lock()
+    timings_lock = threading.Lock()
+
+    def next_index():
+        with index_lock:
+            return next(index_iter, None)
+
+    render_threads = max(1, min(render_threads, len(page_indices) or 1))
+    ready = queue.Queue(maxsize=max(1, queue_depth))
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=_render_worker,
+            args=(session, next_index, ready, stop, render, timings, timings_lock),
+            daemon=True
+        )
+        for _ in range(render_threads)
+    ]
+    for t in threads:
+        t.start()
+
+    # Results wait here until every earlier page has been yielded; only
+    # small text records are held, never images.
+    finished = {}
+    expected = iter(page_indices)
+    next_page = next(expected, None)
+    running = render_threads
+
+    try:
+        while running:
+            wait_start = time.perf_counter()
+            item = ready.get()
+            timings.queue_wait_s += time.perf_counter() - wait_start
+
+            batch = []
+            while True:
+                if item is _DONE:
+                    running -= 1
+                else:
+                    batch.append(item)
+                if len(batch) >= batch_size or not running:
+                    break
+                try:
+                    item = ready.get_nowait()
+                except queue.Empty:
+                    break
+
+            images = [(i, img) for i, img, err in batch if err is None]
+            for page_index, _, err in batch:
+                if err is not None:
+                    print("⚠️ Render failed:", err)
+                    finished[page_index] = None
+
+            if images:
+                infer_start = time.perf_counter()
+                results = recognize_pages([img for _, (img, _) in images], config, cache, render)
+
+                for (page_index, (img, rect)), lines in zip(images, results):
+                    if lines is None:
+                        finished[page_index] = None
+                    else:
+                        with _FITZ_LOCK:
+                            pdf_page = session.page(page_index)
+                        lines, refined = refine_page_lines(
+                            pdf_page, lines, img, rect, config, cache, refine, _FITZ_LOCK
+                        )
+                        finished[page_index] = page_record(
+                            page_index, lines, img, rect, structured,
+                            refined=refined if refine else None
+                        )
+                    timings.pages += 1
+                timings.infer_s += time.perf_counter() - infer_start
+
+            while next_page is not None and next_page in finished:
+                page = finished.pop(next_page)
+                if page:
+                    yield page
+                next_page = next(expected, None)
+    finally:
+        stop.set()
+        # Unblock render threads stuck on a full queue
+        while any(t.is_alive() for t in threads):
+            try:
+                ready.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        timings.wall_s = time.perf_counter() - wall_start
@@ -0,0 +1,526 @@
+"""
+OCR Worker Pool
+
+Spreads page OCR over a pool of worker processes. Each worker builds its
+PaddleOCR model once, when the process starts, and keeps it for every page
+it handles afterwards.
+
+In pre-forked mode the parent builds and warms the model once and forks
+the workers from itself, so they share its read-only weight pages through
+copy-on-write: a new worker starts in milliseconds instead of seconds and
+costs only the memory it writes to. This needs the "fork" start method
+(Linux, macOS); elsewhere workers build their own model as usual.
+
+Inference allocators fragment over long runs, so a worker can be retired
+after a number of pages or once its resident memory crosses a ceiling. A
+retiring worker finishes the page it is on and exits; pages still queued
+for it, or in flight on a worker that died, are handed to the others, and
+a fresh worker takes its place.
+"""
+
+import gc
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, Optional
+
+from core.document import DocumentSession
+from core.ocr_engine import OCRConfig, ocr_page, warm_up
+from core.pdf_images import RenderOptions
+
+try:
+    import psutil
+except ImportError:  # optional; /proc or getrusage are used instead
+    psutil = None
+
+
+# Pages sent to a worker ahead of the one it is working on
+PREFETCH = 2
+
+# A page whose worker died this many times is given up on
+MAX_ATTEMPTS = 2
+
+_MB = 1024 * 1024
+
+
+def process_rss() -> int:
+    """Resident memory of the current process in bytes (0 if unknown)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # Peak rather than current RSS, but still a usable ceiling check
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def process_private_memory() -> int:
+    """
+    Memory only the current process holds (USS), in bytes.
+
+    Pages still shared with the parent after a fork don't count, which is
+    what a ceiling on a pre-forked worker should measure. Falls back to RSS.
+    """
+    if psutil is not None:
+        try:
+            return psutil.Process().memory_full_info().uss
+        except (psutil.AccessDenied, AttributeError):
+            pass
+    try:
+        total = 0
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                    total += int(line.split()[1]) * 1024
+        return total
+    except (OSError, ValueError, IndexError):
+        return process_rss()
+
+
+def _env_limit(name: str) -> Optional[float]:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+@dataclass
+class PoolStats:
+    """
+    Recycling and memory figures of one pool, for tuning the limits.
+
+    Attributes:
+        pages: Pages completed
+        recycled: Workers retired and replaced at a limit
+        recycled_pages: ... of those, at max_pages_per_worker
+        recycled_memory: ... of those, at max_rss_mb
+        crashed: Workers that died unexpectedly and were replaced
+        handed_off: Pages moved to another worker after theirs retired or died
+        peak_rss_mb: Highest resident memory seen on any worker (private
+            memory for pre-forked workers, whose shared weights would
+            otherwise be counted once per worker)
+        worker_peak_rss_mb: Memory high-water mark per worker pid
+    """
+
+    pages: int = 0
+    recycled: int = 0
+    recycled_pages: int = 0
+    recycled_memory: int = 0
+    crashed: int = 0
+    handed_off: int = 0
+    peak_rss_mb: float = 0.0
+    worker_peak_rss_mb: Dict[int, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return {
+            "pages": self.pages,
+            "recycled": self.recycled,
+            "recycled_pages": self.recycled_pages,
+            "recycled_memory": self.recycled_memory,
+            "crashed": self.crashed,
+            "handed_off": self.handed_off,
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "worker_peak_rss_mb": {
+                pid: round(mb, 1) for pid, mb in self.worker_peak_rss_mb.items()
+            }
+        }
+
+
+# Per-process state, populated by _init_worker inside each worker
+_worker_options: Dict = {}
+_worker_session: Optional[DocumentSession] = None
+
+
+def _init_worker(page_options: Dict) -> None:
+    global _worker_options
+    _worker_options = page_options
+    # Load and warm the model up front so the first page does not pay for
+    # it; forked workers inherit a ready model and skip this
+    warm_up(page_options.get("config"), page_options.get("render"))
+
+
+def _worker_open(pdf_path) -> DocumentSession:
+    # Keep the last document open; consecutive pages usually share it
+    global _worker_session
+    if _worker_session is None or _worker_session.path != pdf_path:
+        if _worker_session is not None:
+            _worker_session.close()
+        _worker_session = DocumentSession(pdf_path)
+    return _worker_session
+
+
+def _run_page(pdf_path, page_index):
+    session = _worker_open(pdf_path)
+    return ocr_page(session, page_index, **_worker_options)
+
+
+def _cache_counts():
+    cache = _worker_options.get("cache")
+    return cache.counts() if cache is not None else None
+
+
+def _worker_main(worker_id, page_options, inbox, outbox, max_pages, max_rss, private):
+    # A forked worker finds the parent's model already loaded
+    _init_worker(page_options)
+    measure = process_private_memory if private else process_rss
+    # seq None announces that this worker is warm and taking pages
+    outbox.put((worker_id, os.getpid(), None, None, None, measure(), None, None))
+
+    handled = 0
+    while True:
+        task = inbox.get()
+        if task is None:
+            return
+
+        seq, pdf_path, page_index = task
+        before = _cache_counts()
+        try:
+            result, error = _run_page(pdf_path, page_index), None
+        except Exception as e:
+            # Sent as text: not every exception survives pickling
+            result, error = None, f"{type(e).__name__}: {e}"
+        # The cache counts lookups on this process's copy; the parent's
+        # instance adds them up
+        after = _cache_counts()
+        cache_delta = tuple(a - b for a, b in zip(after, before)) if after else None
+
+        handled += 1
+        rss = measure()
+        retire = None
+        if max_pages and handled >= max_pages:
+            retire = "pages"
+        elif max_rss and rss >= max_rss:
+            retire = "memory"
+
+        outbox.put((worker_id, os.getpid(), seq, result, error, rss, retire, cache_delta))
+        if retire:
+            return
+
+
+class _Worker:
+    """One worker process with its own task queue and in-flight ledger."""
+
+    def __init__(self, ctx, worker_id, page_options, outbox, max_pages, max_rss, private):
+        self.id = worker_id
+        self.inbox = ctx.Queue()
+        # seq -> task sent to this worker and not answered yet
+        self.inflight: Dict[int, tuple] = {}
+        # Set when the pool shrinks: no new pages, stop once idle
+        self.retiring = False
+        self.ready = False
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(worker_id, page_options, self.inbox, outbox, max_pages, max_rss, private),
+            daemon=True
+        )
+        self.process.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        if self.process.is_alive():
+            try:
+                self.inbox.put(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.inbox.close()
+        self.inbox.cancel_join_thread()
+
+
+class OCRWorkerPool:
+    """
+    Process pool for page-parallel OCR.
+
+    Workers receive (pdf path, page index) pairs rather than rendered images,
+    so only the small text results cross the process boundary. The pool can
+    be kept open across documents; `stats` shows how often workers were
+    recycled and how much memory they reached.
+
+    A worker is replaced after `max_pages_per_worker` pages, or once its
+    resident memory exceeds `max_rss_mb` after a page. Either limit left
+    as None falls back to the OCR_WORKER_MAX_PAGES / OCR_WORKER_MAX_RSS_MB
+    env variables, and is off when those aren't set either.
+
+    With `preforked=True` (or OCR_WORKER_PREFORK=1) the model is loaded and
+    warmed in this process on `start`, and workers are forked from it;
+    `scale` then adds workers near-instantly during traffic spikes.
+    Pre-forked pools raise RuntimeError where "fork" isn't available.
+
+    Workers warm their model up before taking pages; `wait_ready` blocks
+    until all of them are hot.
+
+    Usage:
+        with OCRWorkerPool(workers=4, max_rss_mb=3000) as pool:
+            pool.wait_ready()
+            pages = list(pool.map_pages(pdf_path, range(page_count)))
+        print(pool.stats.to_dict())
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        config: Optional[OCRConfig] = None,
+        cache=None,
+        render: Optional[RenderOptions] = None,
+        structured: bool = False,
+        refine=None,
+        max_pages_per_worker: Optional[int] = None,
+        max_rss_mb: Optional[float] = None,
+        preforked: Optional[bool] = None
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.config = config
+        # Keyword arguments every worker passes to ocr_page
+        self.page_options = {
+            "config": config,
+            "cache": cache,
+            "render": render,
+            "structured": structured,
+            "refine": refine
+        }
+        if max_pages_per_worker is None:
+            max_pages_per_worker = _env_limit("OCR_WORKER_MAX_PAGES")
+        if max_rss_mb is None:
+            max_rss_mb = _env_limit("OCR_WORKER_MAX_RSS_MB")
+        self.max_pages_per_worker = int(max_pages_per_worker) if max_pages_per_worker else None
+        self.max_rss_mb = max_rss_mb or None
+        self.stats = PoolStats()
+
+        if preforked is None:
+            preforked = os.environ.get("OCR_WORKER_PREFORK", "") not in ("", "0")
+        if preforked and "fork" not in mp.get_all_start_methods():
+            raise RuntimeError("Pre-forked OCR workers need the 'fork' start method, "
+                               "which this platform doesn't support")
+        self.preforked = preforked
+
+        self._ctx = mp.get_context("fork" if preforked else None)
+        self._outbox = None
+        self._slots: Dict[int, _Worker] = {}
+        self._next_worker_id = 0
+        self._next_seq = 0
+        # Tasks not yet sent to a worker, the seqs current callers wait
+        # for, and finished results not yet yielded
+        self._backlog = deque()
+        self._wanted = set()
+        self._done: Dict[int, Optional[dict]] = {}
+        self._attempts: Dict[int, int] = {}
+
+    def start(self) -> "OCRWorkerPool":
+        if self._outbox is None:
+            if self.preforked:
+                self._warm_parent()
+            self._outbox = self._ctx.Queue()
+            for _ in range(self.workers):
+                self._spawn()
+        return self
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every worker has warmed up its model.
+
+        Returns:
+            False if `timeout` seconds passed first.
+        """
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not all(w.ready for w in self._active()):
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._collect(min(0.5, remaining) if remaining is not None else 0.5)
+        return True
+
+    def scale(self, workers: int) -> None:
+        """
+        Change the number of workers of a running pool.
+
+        New workers start right away; surplus ones stop taking pages and
+        exit once the pages they hold are done.
+        """
+        self.workers = max(1, workers)
+        if self._outbox is None:
+            return
+
+        while len(self._active()) < self.workers:
+            self._spawn()
+
+        surplus = len(self._active()) - self.workers
+        for worker in sorted(self._active(), key=lambda w: len(w.inflight))[:max(0, surplus)]:
+            worker.retiring = True
+            if not worker.inflight:
+                self._remove(worker)
+
+    def shutdown(self) -> None:
+        if self._outbox is None:
+            return
+        for worker in self._slots.values():
+            worker.stop()
+        self._slots.clear()
+        self._outbox.close()
+        self._outbox.cancel_join_thread()
+        self._outbox = None
+        self._backlog.clear()
+        self._wanted.clear()
+        self._done.clear()
+        self._attempts.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def map_pages(self, pdf_path, page_indices: Iterable[int]) -> Iterator[Optional[dict]]:
+        """
+        OCR the given pages in parallel.
+
+        Yields:
+            Page dicts in the order of `page_indices` (None for pages whose
+            OCR failed).
+        """
+        self.start()
+        pdf_path = os.path.abspath(pdf_path)
+
+        order = []
+        for page_index in page_indices:
+            order.append(self._next_seq)
+            self._backlog.append((self._next_seq, pdf_path, page_index))
+            self._next_seq += 1
+        self._wanted.update(order)
+
+        try:
+            for seq in order:
+                while seq not in self._done:
+                    self._dispatch()
+                    self._collect()
+                result = self._done.pop(seq)
+                self._wanted.discard(seq)
+                if isinstance(result, str):
+                    raise RuntimeError(f"OCR worker failed: {result}")
+                yield result
+        finally:
+            # An abandoned call leaves nothing behind for the next one;
+            # pages already on a worker finish and are discarded
+            self._wanted.difference_update(order)
+            self._backlog = deque(t for t in self._backlog if t[0] in self._wanted)
+            for seq in order:
+                self._done.pop(seq, None)
+                self._attempts.pop(seq, None)
+
+    def _warm_parent(self) -> None:
+        # Warming here allocates the predictor's lazily created buffers
+        # once, instead of in every forked worker
+        warm_up(self.page_options.get("config"), self.page_options.get("render"))
+        # Keep the collector from touching (and so copying) every object
+        # the workers inherit
+        gc.freeze()
+
+    def _active(self):
+        return [w for w in self._slots.values() if not w.retiring]
+
+    def _spawn(self) -> None:
+        worker = _Worker(
+            self._ctx,
+            self._next_worker_id,
+            self.page_options,
+            self._outbox,
+            self.max_pages_per_worker,
+            int(self.max_rss_mb * _MB) if self.max_rss_mb else None,
+            self.preforked
+        )
+        self._slots[worker.id] = worker
+        self._next_worker_id += 1
+
+    def _dispatch(self) -> None:
+        for worker in self._active():
+            while self._backlog and len(worker.inflight) < PREFETCH:
+                task = self._backlog.popleft()
+                worker.inflight[task[0]] = task
+                worker.inbox.put(task)
+
+    def _collect(self, timeout: float = 0.5) -> None:
+        try:
+            message = self._outbox.get(timeout=timeout)
+        except queue.Empty:
+            self._replace_dead()
+            return
+
+        worker_id, pid, seq, result, error, rss, retire, cache_delta = message
+
+        if cache_delta:
+            self.page_options["cache"].add_counts(*cache_delta)
+
+        rss_mb = rss / _MB
+        self.stats.peak_rss_mb = max(self.stats.peak_rss_mb, rss_mb)
+        self.stats.worker_peak_rss_mb[pid] = max(self.stats.worker_peak_rss_mb.get(pid, 0.0), rss_mb)
+
+        worker = self._slots.get(worker_id)
+        if seq is None:
+            if worker is not None:
+                worker.ready = True
+            return
+
+        self.stats.pages += 1
+        if seq in self._wanted:
+            self._done[seq] = error if error is not None else result
+
+        if worker is None:
+            return
+        worker.inflight.pop(seq, None)
+
+        if worker.retiring and not retire:
+            if not worker.inflight:
+                self._remove(worker)
+        elif retire:
+            self.stats.recycled += 1
+            if retire == "pages":
+                self.stats.recycled_pages += 1
+            else:
+                self.stats.recycled_memory += 1
+            self._replace(worker)
+
+    def _replace_dead(self) -> None:
+        for worker in list(self._slots.values()):
+            if worker.process.is_alive():
+                continue
+            print(f"⚠️ OCR worker {worker.process.pid} died (exit code {worker.process.exitcode})")
+            self.stats.crashed += 1
+            for seq in worker.inflight:
+                self._attempts[seq] = self._attempts.get(seq, 0) + 1
+            self._replace(worker)
+
+    def _replace(self, worker: _Worker) -> None:
+        """Retire `worker`, hand its unanswered pages back and start a new one."""
+        self._remove(worker)
+        if len(self._active()) < self.workers:
+            self._spawn()
+
+    def _remove(self, worker: _Worker) -> None:
+        del self._slots[worker.id]
+        worker.stop()
+
+        handoff = []
+        for seq, task in worker.inflight.items():
+            if seq not in self._wanted:
+                continue
+            if self._attempts.get(seq, 0) >= MAX_ATTEMPTS:
+                print(f"⚠️ Giving up on page {task[2] + 1}: it took down {MAX_ATTEMPTS} workers")
+                self._done[seq] = None
+            else:
+                handoff.append(task)
+
+        # Handed-off pages go first so results keep flowing in page order
+        self._backlog.extendleft(reversed(handoff))
+        self.stats.handed_off += len(handoff)
+
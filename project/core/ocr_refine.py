@@ -0,0 +1,140 @@
+"""
+Selective Re-OCR
+
+Second pass over the weak lines of a page. Instead of running the whole
+page again at a higher resolution, only the boxes of low-confidence lines
+are re-rendered at `dpi` and recognized again; a crop's result replaces
+the original line when it scores higher.
+"""
+
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from core.ocr_engine import OCRConfig, recognize
+from core.ocr_result import OCRLines
+
+
+@dataclass(frozen=True)
+class RefineOptions:
+    """
+    When and how weak lines are re-recognized.
+
+    Attributes:
+        min_score: Lines scoring below this are re-OCR'd
+        dpi: Resolution the line crops are rendered at
+        pad: Border added around each line box, as a share of its height
+        max_lines: Upper bound on re-OCR'd lines per page, weakest first
+        max_side: Pixel cap for the longest side of a crop
+    """
+
+    min_score: float = 0.85
+    dpi: int = 600
+    pad: float = 0.35
+    max_lines: int = 40
+    max_side: int = 2500
+
+
+DEFAULT_REFINE_OPTIONS = RefineOptions()
+
+
+def weak_lines(lines: OCRLines, options: RefineOptions) -> np.ndarray:
+    """Indices of the lines to re-OCR, weakest first."""
+    boxes = lines.boxes
+    has_area = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+    candidates = np.flatnonzero((lines.scores < options.min_score) & has_area)
+    order = np.argsort(lines.scores[candidates], kind="stable")
+    return candidates[order][:options.max_lines]
+
+
+def _line_clip(box, to_page, page_rect, pad) -> fitz.Rect:
+    sx, sy, dx, dy = to_page
+    x0, y0, x1, y1 = box
+    clip = fitz.Rect(x0 * sx + dx, y0 * sy + dy, x1 * sx + dx, y1 * sy + dy)
+    grow = pad * clip.height
+    return (clip + (-grow, -grow, grow, grow)) & page_rect
+
+
+def _render_clip(page, clip, options: RefineOptions):
+    zoom = options.dpi / 72
+    longest = max(clip.width, clip.height)
+    if longest * zoom > options.max_side:
+        zoom = options.max_side / longest
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip)
+    rgb = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+
+def _merge_crop(result: OCRLines) -> Tuple[str, float]:
+    """Read a crop's lines left to right as one line, scored by text length."""
+    result = result.filter(min_score=-1.0)
+    if not len(result):
+        return "", 0.0
+
+    order = np.lexsort((result.boxes[:, 0], np.round(result.boxes[:, 1] / 8)))
+    texts = [result.texts[i] for i in order]
+    weights = np.array([len(t) for t in texts], dtype=np.float32)
+    score = float((result.scores[order] * weights).sum() / weights.sum())
+    return " ".join(texts), score
+
+
+def refine_lines(
+    page,
+    lines: OCRLines,
+    img,
+    rect,
+    config: Optional[OCRConfig] = None,
+    cache=None,
+    options: Optional[RefineOptions] = None,
+    lock=None
+) -> Tuple[OCRLines, int]:
+    """
+    Re-OCR the weak lines of a page at a higher resolution.
+
+    Args:
+        page: The fitz page `img` was rasterized from
+        lines: Lines recognized on `img`, in image pixels
+        img: The OCR image
+        rect: Part of the page (displayed points) that `img` covers
+        config: Model configuration
+        cache: Optional OCRCache, also used for the crops
+        options: Refinement settings
+        lock: Optional lock held around PyMuPDF calls
+
+    Returns:
+        (lines, replaced): the lines with improved texts and scores swapped
+        in (geometry is unchanged) and the number of lines replaced.
+    """
+    options = options or DEFAULT_REFINE_OPTIONS
+    targets = weak_lines(lines, options)
+    if not len(targets):
+        return lines, 0
+
+    h, w = img.shape[:2]
+    to_page = (rect.width / w, rect.height / h, rect.x0, rect.y0)
+
+    crops: List = []
+    with lock or nullcontext():
+        for i in targets:
+            clip = _line_clip(lines.boxes[i], to_page, page.rect, options.pad)
+            crops.append(_render_clip(page, clip, options))
+
+    results = recognize(crops, config, cache)
+
+    texts = list(lines.texts)
+    scores = lines.scores.copy()
+    replaced = 0
+    for i, result in zip(targets, results):
+        if result is None:
+            continue
+        text, score = _merge_crop(result)
+        if text.strip() and score > scores[i]:
+            texts[i] = text
+            scores[i] = score
+            replaced += 1
+
+    return OCRLines(texts, scores, lines.polys, lines.boxes), replaced
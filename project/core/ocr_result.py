@@ -0,0 +1,150 @@
+"""
+OCR Result Container
+
+Compact, NumPy-backed storage for the lines recognized on one image:
+texts plus per-line arrays of polygons, boxes and confidence scores.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+def _empty_scores():
+    return np.zeros(0, dtype=np.float32)
+
+
+def _empty_polys():
+    return np.zeros((0, 4, 2), dtype=np.float32)
+
+
+def _empty_boxes():
+    return np.zeros((0, 4), dtype=np.float32)
+
+
+@dataclass
+class OCRLines:
+    """
+    Lines recognized on one image.
+
+    Attributes:
+        texts: Recognized text per line
+        scores: (N,) float32 recognition confidence per line
+        polys: (N, 4, 2) float32 quadrilateral per line, clockwise from top-left
+        boxes: (N, 4) float32 axis-aligned box per line as x0, y0, x1, y1
+    """
+
+    texts: List[str] = field(default_factory=list)
+    scores: np.ndarray = field(default_factory=_empty_scores)
+    polys: np.ndarray = field(default_factory=_empty_polys)
+    boxes: np.ndarray = field(default_factory=_empty_boxes)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @staticmethod
+    def boxes_from_polys(polys: np.ndarray) -> np.ndarray:
+        if not len(polys):
+            return _empty_boxes()
+        return np.concatenate([polys.min(axis=1), polys.max(axis=1)], axis=1)
+
+    @classmethod
+    def from_paddle(cls, page_data) -> "OCRLines":
+        """Build from one PaddleOCR result (rec_texts, rec_scores, rec_polys)."""
+        texts = [str(t) for t in page_data.get("rec_texts", [])]
+        n = len(texts)
+
+        scores = np.ones(n, dtype=np.float32)
+        rec_scores = np.asarray(page_data.get("rec_scores", []), dtype=np.float32)
+        scores[:min(n, len(rec_scores))] = rec_scores[:n]
+
+        polys = _empty_polys()
+        rec_polys = page_data.get("rec_polys")
+        if rec_polys is not None and len(rec_polys) == n:
+            quads = [np.asarray(p, dtype=np.float32).reshape(-1, 2) for p in rec_polys]
+            if all(q.shape == (4, 2) for q in quads):
+                polys = np.stack(quads) if quads else polys
+
+        rec_boxes = page_data.get("rec_boxes")
+        if rec_boxes is not None and len(rec_boxes) == n:
+            boxes = np.asarray(rec_boxes, dtype=np.float32).reshape(n, 4)
+        elif len(polys) == n:
+            boxes = cls.boxes_from_polys(polys)
+        else:
+            boxes = np.zeros((n, 4), dtype=np.float32)
+
+        if len(polys) != n:
+            # Non-quad detections: fall back to the box corners
+            x0, y0, x1, y1 = boxes.T
+            polys = np.stack(
+                [np.stack([x0, y0], 1), np.stack([x1, y0], 1),
+                 np.stack([x1, y1], 1), np.stack([x0, y1], 1)],
+                axis=1
+            ).astype(np.float32)
+
+        return cls(texts, scores, polys, boxes)
+
+    def select(self, index) -> "OCRLines":
+        """Subset of lines by boolean mask or integer indices."""
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        return OCRLines(
+            [self.texts[i] for i in index],
+            self.scores[index],
+            self.polys[index],
+            self.boxes[index]
+        )
+
+    def filter(self, min_score: float = 0.25) -> "OCRLines":
+        """Lines scoring above `min_score` with non-blank text."""
+        keep = (self.scores > min_score) & np.array(
+            [bool(t.strip()) for t in self.texts], dtype=bool
+        )
+        return self.select(keep)
+
+    def text(self, min_score: float = 0.25) -> str:
+        return "\n".join(self.filter(min_score).texts)
+
+    def mapped(self, scale_x: float, scale_y: float, dx: float = 0.0, dy: float = 0.0) -> "OCRLines":
+        """Same lines with coordinates mapped by x * scale_x + dx, y * scale_y + dy."""
+        scale = np.array([scale_x, scale_y], dtype=np.float32)
+        offset = np.array([dx, dy], dtype=np.float32)
+        return OCRLines(
+            list(self.texts),
+            self.scores.copy(),
+            self.polys * scale + offset,
+            self.boxes * np.tile(scale, 2) + np.tile(offset, 2)
+        )
+
+    @classmethod
+    def concat(cls, parts: Sequence["OCRLines"]) -> "OCRLines":
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls()
+        return cls(
+            [t for p in parts for t in p.texts],
+            np.concatenate([p.scores for p in parts]),
+            np.concatenate([p.polys for p in parts]),
+            np.concatenate([p.boxes for p in parts])
+        )
+
+    def to_dict(self) -> Dict:
+        """JSON-friendly form (used by the on-disk cache)."""
+        return {
+            "texts": self.texts,
+            "scores": self.scores.tolist(),
+            "polys": self.polys.tolist(),
+            "boxes": self.boxes.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "OCRLines":
+        n = len(data["texts"])
+        return cls(
+            list(data["texts"]),
+            np.asarray(data["scores"], dtype=np.float32).reshape(n),
+            np.asarray(data["polys"], dtype=np.float32).reshape(n, 4, 2),
+            np.asarray(data["boxes"], dtype=np.float32).reshape(n, 4)
+        )
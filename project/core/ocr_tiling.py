@@ -0,0 +1,280 @@
+"""
+Tiled OCR
+
+Pages larger than the pixel budget are normally downscaled to fit it,
+which can take the small print of A3 annexures and dense Udyam tables
+below readable size. In tiling mode (`RenderOptions(tile=True)`) such pages
+keep their full rendering resolution and are cut into overlapping tiles of
+at most `max_side` pixels. The tiles go through the model as one batch and
+their lines are stitched back into page-image coordinates: lines read
+twice in an overlap are kept once, and lines a seam cut in two are joined.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.ocr_result import OCRLines
+
+
+# A line box ending within this many pixels, or within a glyph width
+# (GLYPH line heights), of a tile edge that is a seam was cut by it; the
+# detector often drops the sliced glyph itself
+EDGE = 4
+GLYPH = 0.7
+
+Tile = Tuple[int, int, int, int]
+
+
+def tile_grid(width: int, height: int, tile: int, overlap: int) -> List[Tile]:
+    """
+    Overlapping (x0, y0, x1, y1) tiles covering a width x height image.
+
+    Tiles are at most `tile` pixels a side and spread evenly, so adjacent
+    tiles overlap by at least `overlap` pixels.
+    """
+    overlap = max(0, min(overlap, tile // 2))
+
+    def spans(length):
+        if length <= tile:
+            return [(0, length)]
+        n = math.ceil((length - overlap) / (tile - overlap))
+        step = (length - tile) / (n - 1)
+        return [(round(i * step), round(i * step) + tile) for i in range(n)]
+
+    return [(x0, y0, x1, y1) for y0, y1 in spans(height) for x0, x1 in spans(width)]
+
+
+@dataclass
+class _Piece:
+    text: str
+    score: float
+    box: np.ndarray
+    tiles: FrozenSet[int]
+    # Cut by a seam on the left, top, right, bottom
+    cut: Tuple[bool, bool, bool, bool]
+
+    @property
+    def height(self) -> float:
+        return float(self.box[3] - self.box[1])
+
+    @property
+    def area(self) -> float:
+        return float(max(self.box[2] - self.box[0], 0) * max(self.box[3] - self.box[1], 0))
+
+
+def _pieces(parts: Sequence[Optional[OCRLines]], tiles: Sequence[Tile], width: int, height: int):
+    pieces = []
+    for index, ((x0, y0, x1, y1), lines) in enumerate(zip(tiles, parts)):
+        if lines is None:
+            continue
+        lines = lines.mapped(1.0, 1.0, x0, y0)
+        for text, score, box in zip(lines.texts, lines.scores, lines.boxes):
+            reach = max(EDGE, GLYPH * float(box[3] - box[1]))
+            cut = (
+                x0 > 0 and box[0] - x0 <= reach,
+                y0 > 0 and box[1] - y0 <= EDGE,
+                x1 < width and x1 - box[2] <= reach,
+                y1 < height and y1 - box[3] <= EDGE,
+            )
+            pieces.append(_Piece(text, float(score), box.copy(), frozenset([index]), cut))
+    return pieces
+
+
+def _join_text(left: _Piece, right: _Piece) -> str:
+    a, b = left.text, right.text
+    # Both tiles read the overlap, so the end of the left piece is the start
+    # of the right one; take the longest such match, allowing for a garbled
+    # glyph where the seam sliced the left piece
+    for at in range(max(0, len(a) - len(b)), len(a) - 2):
+        if b.startswith(a[at:]) or b.startswith(a[at:-1]):
+            return a[:at] + b
+
+    # No common text: drop the share of the right piece that lies under
+    # the left one
+    width = max(float(right.box[2] - right.box[0]), 1.0)
+    shared = min(max(float(left.box[2] - right.box[0]) / width, 0.0), 1.0)
+    rest = b[int(round(len(b) * shared)):].strip()
+    return f"{a.rstrip()} {rest}" if rest else a
+
+
+def _join(left: _Piece, right: _Piece) -> _Piece:
+    text = _join_text(left, right)
+    weights = (max(len(left.text), 1), max(len(right.text), 1))
+    score = (left.score * weights[0] + right.score * weights[1]) / sum(weights)
+    box = np.concatenate([np.minimum(left.box[:2], right.box[:2]), np.maximum(left.box[2:], right.box[2:])])
+    cut = (left.cut[0], left.cut[1] and right.cut[1], right.cut[2], left.cut[3] and right.cut[3])
+    return _Piece(text, score, box, left.tiles | right.tiles, cut)
+
+
+def _partner(left: _Piece, pieces: List[_Piece]) -> Optional[_Piece]:
+    """The piece continuing `left` past the seam that cut its right end."""
+    best, best_shared = None, 0.0
+    for piece in pieces:
+        if piece is left or not piece.cut[0] or piece.tiles & left.tiles:
+            continue
+        if not (piece.box[0] < left.box[2] < piece.box[2]):
+            continue
+        overlap = min(left.box[3], piece.box[3]) - max(left.box[1], piece.box[1])
+        if overlap < 0.5 * min(left.height, piece.height):
+            continue
+        # The next tile over shares the most width; a tile two over may
+        # overlap too, by a sliver
+        shared = float(left.box[2] - piece.box[0])
+        if shared > best_shared:
+            best, best_shared = piece, shared
+    return best
+
+
+def _covers(outer: _Piece, inner: _Piece) -> bool:
+    """`outer`, from another tile, reads all of `inner` and maybe more."""
+    if outer.tiles & inner.tiles:
+        return False
+    # Box ends may wobble by a glyph, except where a seam cut `outer`:
+    # anything past that edge is text it didn't see
+    tol = max(EDGE, GLYPH * inner.height)
+    left_tol = 0.0 if outer.cut[0] else tol
+    right_tol = 0.0 if outer.cut[2] else tol
+    overlap = min(outer.box[3], inner.box[3]) - max(outer.box[1], inner.box[1])
+    return (
+        overlap >= 0.5 * min(outer.height, inner.height)
+        and outer.box[0] - left_tol <= inner.box[0]
+        and inner.box[2] <= outer.box[2] + right_tol
+    )
+
+
+def _drop_covered(pieces: List[_Piece]) -> List[_Piece]:
+    # Longest readings first, so of two equal copies the first one stays
+    pieces = sorted(pieces, key=lambda p: (-len(p.text), any(p.cut), -p.score))
+    kept: List[_Piece] = []
+    for piece in pieces:
+        if not any(_covers(k, piece) for k in kept):
+            kept.append(piece)
+    return kept
+
+
+def _is_duplicate(piece: _Piece, kept: _Piece) -> bool:
+    if piece.tiles & kept.tiles:
+        return False
+    w = min(piece.box[2], kept.box[2]) - max(piece.box[0], kept.box[0])
+    h = min(piece.box[3], kept.box[3]) - max(piece.box[1], kept.box[1])
+    if w <= 0 or h <= 0:
+        return False
+    return w * h >= 0.6 * max(min(piece.area, kept.area), 1.0)
+
+
+def merge_tile_lines(
+    parts: Sequence[Optional[OCRLines]],
+    tiles: Sequence[Tile],
+    width: int,
+    height: int
+) -> OCRLines:
+    """
+    Stitch per-tile results into lines of the whole image.
+
+    Args:
+        parts: OCR result of each tile, in tile coordinates
+        tiles: The tiles, as returned by `tile_grid`
+        width, height: Size of the tiled image
+
+    Returns:
+        Lines in image coordinates, top to bottom.
+    """
+    # A piece another tile read in full (plus more) adds nothing and could
+    # only pair up with the wrong partner
+    pieces = _drop_covered(_pieces(parts, tiles, width, height))
+
+    # Join lines cut by a vertical seam, left to right, so a line spanning
+    # three tiles is joined twice
+    pieces.sort(key=lambda p: float(p.box[0]))
+    joined = True
+    while joined:
+        joined = False
+        for piece in pieces:
+            if not piece.cut[2]:
+                continue
+            partner = _partner(piece, pieces)
+            if partner is not None:
+                pieces.remove(piece)
+                pieces.remove(partner)
+                pieces.append(_join(piece, partner))
+                joined = True
+                break
+
+    # Of the lines read in an overlap keep one, preferring a copy no seam
+    # touched, then one read whole by a single tile over a joined one (tiles
+    # two apart can overlap slightly and yield a bogus join), then the
+    # longer reading
+    pieces.sort(key=lambda p: (any(p.cut), len(p.tiles), -len(p.text), -p.score))
+    kept: List[_Piece] = []
+    for piece in pieces:
+        if not any(_is_duplicate(piece, k) for k in kept):
+            kept.append(piece)
+
+    if not kept:
+        return OCRLines()
+
+    boxes = np.array([p.box for p in kept], dtype=np.float32)
+    line_height = max(float(np.median(boxes[:, 3] - boxes[:, 1])), 1.0)
+    rows = np.floor((boxes[:, 1] + boxes[:, 3]) / 2 / line_height)
+    order = np.lexsort((boxes[:, 0], rows))
+
+    boxes = boxes[order]
+    polys = np.stack([
+        boxes[:, [0, 1]], boxes[:, [2, 1]], boxes[:, [2, 3]], boxes[:, [0, 3]]
+    ], axis=1)
+    return OCRLines(
+        [kept[i].text for i in order],
+        np.array([kept[i].score for i in order], dtype=np.float32),
+        polys,
+        boxes
+    )
+
+
+def recognize_tiled(
+    images,
+    config=None,
+    cache=None,
+    tile: int = 2500,
+    overlap: int = 200
+) -> List[Optional[OCRLines]]:
+    """
+    `recognize` with images larger than `tile` pixels OCR'd in tiles.
+
+    Tiles of every image and the images small enough to go whole are sent
+    to the model in one call, so no inference input exceeds `tile` pixels
+    a side.
+
+    Returns:
+        One OCRLines per input image in its own coordinates (None when OCR
+        failed for the whole image).
+    """
+    from core.ocr_engine import recognize
+
+    batch = []
+    plan = []
+    for img in images:
+        h, w = img.shape[:2]
+        if max(h, w) <= tile:
+            plan.append((len(batch), None, w, h))
+            batch.append(img)
+            continue
+        grid = tile_grid(w, h, tile, overlap)
+        plan.append((len(batch), grid, w, h))
+        batch += [np.ascontiguousarray(img[y0:y1, x0:x1]) for x0, y0, x1, y1 in grid]
+
+    results = recognize(batch, config, cache)
+
+    out: List[Optional[OCRLines]] = []
+    for start, grid, w, h in plan:
+        if grid is None:
+            out.append(results[start])
+            continue
+        parts = results[start:start + len(grid)]
+        if all(part is None for part in parts):
+            out.append(None)
+        else:
+            out.append(merge_tile_lines(parts, grid, w, h))
+    return out
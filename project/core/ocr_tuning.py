@@ -0,0 +1,305 @@
+"""
+OCR Runtime Tuning
+
+Intra-op threads, oneDNN, the recognition batch size and the render size
+that run fastest differ from one worker box to the next. `calibrate` times
+OCR of a few sample pages under each setting and keeps the fastest one
+whose mean line confidence stays above a floor; `save_tuned_settings`
+writes it next to the OCR cache, and from then on the engine's defaults
+(`default_ocr_config`, `default_render_options`) pick it up by themselves.
+
+Settings are swept one at a time (threads, then oneDNN, then batch size,
+then render size), each starting from the best of the previous ones, which
+keeps the calibration to a couple of dozen runs instead of the full grid.
+
+Usage:
+    python tune_ocr.py [pdf_dir]
+"""
+
+import glob
+import json
+import os
+import platform
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from core.ocr_cache import default_cache_dir
+from core.ocr_engine import DEFAULT_OCR_CONFIG, OCRConfig
+
+
+# OCRConfig fields the tuner is allowed to change
+TUNED_FIELDS = ("cpu_threads", "enable_mkldnn", "rec_batch_size")
+
+
+@dataclass(frozen=True)
+class TunedSettings:
+    """
+    Outcome of a calibration run.
+
+    Attributes:
+        config: Model configuration with the tuned fields set
+        max_side: Render pixel budget for the longest page side
+        seconds_per_page: Measured OCR time per sample page
+        confidence: Mean line confidence over the sample pages
+        cpu_count: CPUs of the host the settings were measured on
+    """
+
+    config: OCRConfig
+    max_side: Optional[int]
+    seconds_per_page: float
+    confidence: float
+    cpu_count: int
+
+    def to_dict(self) -> Dict:
+        return {
+            "config": {name: getattr(self.config, name) for name in TUNED_FIELDS},
+            "max_side": self.max_side,
+            "seconds_per_page": round(self.seconds_per_page, 4),
+            "confidence": round(self.confidence, 4),
+            "cpu_count": self.cpu_count,
+            "machine": platform.machine(),
+            "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TunedSettings":
+        tuned = {k: v for k, v in data.get("config", {}).items() if k in TUNED_FIELDS}
+        return cls(
+            config=replace(DEFAULT_OCR_CONFIG, **tuned),
+            max_side=data.get("max_side"),
+            seconds_per_page=float(data.get("seconds_per_page", 0.0)),
+            confidence=float(data.get("confidence", 0.0)),
+            cpu_count=int(data.get("cpu_count", 0)),
+        )
+
+
+def tuning_path() -> str:
+    """Settings file, overridable through OCR_TUNING_FILE ("" disables tuning)."""
+    return os.environ.get(
+        "OCR_TUNING_FILE",
+        os.path.join(default_cache_dir(), "ocr_tuning.json")
+    )
+
+
+def load_tuned_settings(path: Optional[str] = None) -> Optional[TunedSettings]:
+    """
+    Read tuned settings; None when there are none for this host.
+
+    Settings measured on a machine with a different CPU count are ignored,
+    since thread counts in particular don't carry over.
+    """
+    path = tuning_path() if path is None else path
+    if not path or not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            settings = TunedSettings.from_dict(json.load(f))
+    except (OSError, ValueError, TypeError) as e:
+        print(f"⚠️ Ignoring OCR tuning file {path}: {e}")
+        return None
+
+    if settings.cpu_count and settings.cpu_count != os.cpu_count():
+        print(f"⚠️ OCR tuning file {path} was made on a {settings.cpu_count}-CPU host, ignoring it")
+        return None
+    return settings
+
+
+def save_tuned_settings(settings: TunedSettings, path: Optional[str] = None) -> str:
+    path = path or tuning_path() or os.path.join(default_cache_dir(), "ocr_tuning.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings.to_dict(), f, indent=2)
+    reset_tuned_settings()
+    return path
+
+
+_tuned: Optional[Tuple[Optional[TunedSettings]]] = None
+_tuned_lock = threading.Lock()
+
+
+def tuned_settings() -> Optional[TunedSettings]:
+    """Tuned settings of this host, read once per process."""
+    global _tuned
+    if _tuned is None:
+        with _tuned_lock:
+            if _tuned is None:
+                _tuned = (load_tuned_settings(),)
+    return _tuned[0]
+
+
+def reset_tuned_settings() -> None:
+    """Forget the settings read so far; the next lookup reads the file again."""
+    global _tuned
+    with _tuned_lock:
+        _tuned = None
+
+
+def sample_pages(pdf_dir: str, max_pages: int = 6) -> List[Tuple[str, int]]:
+    """
+    (pdf path, page index) pairs to calibrate on.
+
+    Pages without a usable text layer are preferred, as those are the ones
+    that are OCR'd in production; files are taken round-robin so one long
+    document doesn't make up the whole sample.
+    """
+    from core.document import DocumentSession
+    from core.extractor import is_text_usable
+
+    scanned: List[List[Tuple[str, int]]] = []
+    digital: List[Tuple[str, int]] = []
+    for path in sorted(glob.glob(os.path.join(pdf_dir, "*.pdf"))):
+        pages = []
+        with DocumentSession(path) as session:
+            for page_index in range(len(session)):
+                if is_text_usable(session.page_text(page_index)):
+                    digital.append((path, page_index))
+                else:
+                    pages.append((path, page_index))
+        scanned.append(pages)
+
+    picked: List[Tuple[str, int]] = []
+    depth = 0
+    while len(picked) < max_pages and any(depth < len(p) for p in scanned):
+        picked += [p[depth] for p in scanned if depth < len(p)]
+        depth += 1
+    picked += digital
+    return picked[:max_pages]
+
+
+def _render_samples(samples, max_side: Optional[int]):
+    from core.document import DocumentSession
+    from core.ocr_engine import render_page
+    from core.pdf_images import RenderOptions
+
+    render = RenderOptions(max_side=max_side)
+    images = []
+    for path, page_index in samples:
+        with DocumentSession(path) as session:
+            images.append(render_page(session.page(page_index), render)[0])
+    return images
+
+
+def measure(config: OCRConfig, images: Sequence, repeats: int = 1) -> Tuple[float, float]:
+    """
+    Time OCR of `images` one page at a time, as the serial path runs them.
+
+    The model is built and warmed on the first image before timing starts,
+    and unloaded afterwards so candidates don't pile up in memory.
+
+    Returns:
+        (seconds per page, mean line confidence); a configuration that
+        fails to run gets confidence 0.
+    """
+    from core.dpi_policy import page_confidence
+    from core.ocr_engine import get_model_manager, recognize
+
+    manager = get_model_manager()
+    try:
+        recognize(images[:1], config)
+
+        elapsed = 0.0
+        scores = []
+        for _ in range(max(1, repeats)):
+            for img in images:
+                start = time.perf_counter()
+                lines = recognize([img], config)[0]
+                elapsed += time.perf_counter() - start
+                scores.append(page_confidence(lines) if lines is not None else 0.0)
+    except Exception as e:
+        print(f"⚠️ {config} failed: {e}")
+        return float("inf"), 0.0
+    finally:
+        manager.unload(config)
+
+    return elapsed / len(scores), sum(scores) / len(scores)
+
+
+def _thread_candidates(cpu_count: int) -> List[int]:
+    counts = {1, cpu_count}
+    n = 2
+    while n < cpu_count:
+        counts.add(n)
+        n *= 2
+    return sorted(counts)
+
+
+def calibrate(
+    pdf_dir: str,
+    min_confidence: float = 0.85,
+    max_pages: int = 6,
+    repeats: int = 1,
+    batch_sizes: Sequence[int] = (1, 6, 16),
+    max_sides: Sequence[int] = (1600, 2000, 2500),
+    log: Callable[[str], None] = print
+) -> TunedSettings:
+    """
+    Find the fastest OCR settings for this host.
+
+    Args:
+        pdf_dir: Folder of sample PDFs (the bundled testing_data)
+        min_confidence: Mean line confidence a setting must keep; when the
+            default settings already fall short, their confidence is the floor
+        max_pages: Number of sample pages
+        repeats: Timed passes over the sample pages per setting
+        batch_sizes: Recognition batch sizes to try
+        max_sides: Render pixel budgets to try
+
+    Returns:
+        The best settings found (not yet saved).
+    """
+    samples = sample_pages(pdf_dir, max_pages)
+    if not samples:
+        raise ValueError(f"No PDF pages found in {pdf_dir}")
+    log(f"🔧 Calibrating on {len(samples)} pages from {pdf_dir}")
+
+    cpu_count = os.cpu_count() or 1
+    images_by_side: Dict[Optional[int], List] = {}
+    measured: Dict[Tuple[OCRConfig, Optional[int]], Tuple[float, float]] = {}
+
+    def run(config, max_side):
+        key = (config, max_side)
+        if key not in measured:
+            if max_side not in images_by_side:
+                images_by_side[max_side] = _render_samples(samples, max_side)
+            measured[key] = measure(config, images_by_side[max_side], repeats)
+            seconds, confidence = measured[key]
+            log(f"   {_describe(config, max_side)}: {seconds:.3f}s/page, confidence {confidence:.3f}")
+        return measured[key]
+
+    default_side = max(max_sides)
+    base_seconds, base_confidence = run(DEFAULT_OCR_CONFIG, default_side)
+    floor = min(min_confidence, base_confidence)
+
+    best = (DEFAULT_OCR_CONFIG, default_side)
+    best_seconds = base_seconds
+
+    sweeps = [
+        ("cpu_threads", _thread_candidates(cpu_count)),
+        ("enable_mkldnn", (False, True)),
+        ("rec_batch_size", tuple(batch_sizes)),
+        ("max_side", tuple(max_sides)),
+    ]
+    for name, values in sweeps:
+        # Each sweep varies one setting of the best combination so far
+        config, max_side = best
+        for value in values:
+            if name == "max_side":
+                candidate = (config, value)
+            else:
+                candidate = (replace(config, **{name: value}), max_side)
+            seconds, confidence = run(*candidate)
+            if confidence >= floor and seconds < best_seconds:
+                best, best_seconds = candidate, seconds
+
+    seconds, confidence = measured[best]
+    log(f"✅ Best: {_describe(*best)} at {seconds:.3f}s/page "
+        f"(default {base_seconds:.3f}s/page)")
+    return TunedSettings(best[0], best[1], seconds, confidence, cpu_count)
+
+
+def _describe(config: OCRConfig, max_side: Optional[int]) -> str:
+    return (f"threads={config.cpu_threads} mkldnn={config.enable_mkldnn} "
+            f"rec_batch={config.rec_batch_size} max_side={max_side}")
@@ -0,0 +1,200 @@
+"""
+Pre-OCR Page Filter
+
+Cheap classification of pages before they reach the model. Each page is
+rendered once in grayscale at a resolution where glyphs are still visible.
+Pages without a single mark bigger than dust are skipped as blank. A page
+reuses the OCR result of a page already seen in the same job only when
+the two are the same to the pixel: a perceptual hash finds candidates and
+a per-pixel comparison confirms them. Pages of one form template with
+different data look alike at thumbnail size, so the hash alone can't do.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+
+BLANK = "blank"
+DUPLICATE = "duplicate"
+OCR = "ocr"
+
+
+@dataclass
+class PageVerdict:
+    """
+    Outcome of classifying one page.
+
+    Attributes:
+        kind: BLANK, DUPLICATE or OCR
+        ink_ratio: Share of page pixels darker than the background
+        duplicate_of: (document path, 0-based page index) of the matching
+            page, for duplicates
+    """
+
+    kind: str
+    ink_ratio: float
+    duplicate_of: Optional[Tuple[str, int]] = None
+
+
+def page_thumbnail(page, side: int = 256) -> np.ndarray:
+    """Grayscale rendering of a page with its longest side at `side` px."""
+    zoom = side / max(page.rect.width, page.rect.height)
+    if page.get_images():
+        # MuPDF turns raster images gray slowly; OpenCV does it at a fraction
+        # of the cost
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        rgb = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+
+
+def ink_marks(img: np.ndarray, contrast: int = 40, min_area: int = 12) -> int:
+    """Number of connected ink blobs of at least `min_area` pixels."""
+    background = np.median(img)
+    ink = (img < background - contrast).astype(np.uint8)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    return int(np.count_nonzero(stats[1:, cv2.CC_STAT_AREA] >= min_area))
+
+
+def ink_ratio(thumb: np.ndarray, contrast: int = 40) -> float:
+    """Share of pixels noticeably darker than the page background."""
+    background = np.median(thumb)
+    return float(np.count_nonzero(thumb < background - contrast)) / thumb.size
+
+
+def dhash(thumb: np.ndarray, size: int = 16) -> np.ndarray:
+    """Difference hash: size*size bits, packed into a uint8 array."""
+    small = cv2.resize(thumb, (size + 1, size), interpolation=cv2.INTER_AREA)
+    small = small.astype(np.int16)
+    return np.packbits((small[:, 1:] > small[:, :-1]).ravel())
+
+
+class PageFilter:
+    """
+    Skips blank pages and reuses results for pixel-identical pages.
+
+    One instance covers one job: share it across the documents of a batch
+    and a duplicate in a later document reuses the earlier document's page.
+    The check image of every OCR'd page is kept for the comparison, about
+    0.7 MB per A4 page at the default `check_side`.
+
+    Attributes:
+        blank_ink_ratio: Pages with less ink than this share of pixels are
+            blank, unless some ink forms a mark of `min_mark_area` pixels
+        min_mark_area: Smallest ink blob, in check-image pixels, that counts
+            as content rather than dust
+        max_hash_distance: dHash bits two pages may differ in to be compared
+        max_pixel_diff: Largest gray-level difference between any two
+            pixels of duplicate pages (after a 3x3 blur against
+            anti-aliasing noise); a changed glyph differs by far more
+        check_side: Longest side of the check image, in pixels
+        thumb_side: Longest side of the thumbnail the hash is taken from
+
+    Usage:
+        page_filter = PageFilter()
+        pages = extract_ocr_text(pdf_path, page_filter=page_filter)
+        print(page_filter.report())
+    """
+
+    def __init__(
+        self,
+        blank_ink_ratio: float = 0.0005,
+        min_mark_area: int = 12,
+        max_hash_distance: int = 2,
+        max_pixel_diff: int = 48,
+        check_side: int = 1024,
+        thumb_side: int = 256
+    ):
+        self.blank_ink_ratio = blank_ink_ratio
+        self.min_mark_area = min_mark_area
+        self.max_hash_distance = max_hash_distance
+        self.max_pixel_diff = max_pixel_diff
+        self.check_side = check_side
+        self.thumb_side = thumb_side
+
+        self._keys: List[Tuple[str, int]] = []
+        self._hashes: List[np.ndarray] = []
+        self._checks: List[np.ndarray] = []
+        self._records: Dict[Tuple[str, int], Dict] = {}
+
+        self.checked = 0
+        self.blank: List[Tuple[str, int]] = []
+        self.duplicates: List[Tuple[Tuple[str, int], Tuple[str, int]]] = []
+
+    def _find_duplicate(self, key, digest, check) -> Optional[Tuple[str, int]]:
+        if not self._hashes:
+            return None
+
+        # Hamming distance to every seen page at once
+        distances = np.unpackbits(np.stack(self._hashes) ^ digest, axis=1).sum(axis=1)
+        for i in np.argsort(distances):
+            if distances[i] > self.max_hash_distance:
+                break
+            if self._keys[i] == key or self._checks[i].shape != check.shape:
+                continue
+            # Confirm on every pixel: a different name or number on the same
+            # form moves the mean by a fraction of a gray level, but not the max
+            diff = cv2.absdiff(self._checks[i], check).max()
+            if diff <= self.max_pixel_diff:
+                return self._keys[i]
+        return None
+
+    def classify(self, session, page_index: int) -> PageVerdict:
+        """Classify a page and remember it for later duplicate checks."""
+        self.checked += 1
+        key = (session.path, page_index)
+
+        image = page_thumbnail(session.page(page_index), self.check_side)
+        ratio = ink_ratio(image)
+        # A lone date or stamped number is little ink but not a blank page;
+        # anything short of certain goes to OCR
+        if ratio < self.blank_ink_ratio and not ink_marks(image, min_area=self.min_mark_area):
+            self.blank.append(key)
+            return PageVerdict(BLANK, ratio)
+
+        scale = self.thumb_side / max(image.shape)
+        thumb = cv2.resize(
+            image,
+            (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale))),
+            interpolation=cv2.INTER_AREA
+        )
+        digest = dhash(thumb)
+        check = cv2.GaussianBlur(image, (3, 3), 0)
+
+        original = self._find_duplicate(key, digest, check)
+        if original is not None:
+            self.duplicates.append((key, original))
+            return PageVerdict(DUPLICATE, ratio, original)
+
+        self._keys.append(key)
+        self._hashes.append(digest)
+        self._checks.append(check)
+        return PageVerdict(OCR, ratio)
+
+    def store(self, session, page_index: int, record: Optional[Dict]) -> None:
+        """Keep an OCR'd page's record so later duplicates can reuse it."""
+        if record is not None:
+            self._records[(session.path, page_index)] = record
+
+    def lookup(self, key: Tuple[str, int]) -> Optional[Dict]:
+        return self._records.get(key)
+
+    def report(self) -> Dict:
+        """What was skipped so far, with 1-based page numbers."""
+        def label(key):
+            return {"document": os.path.basename(key[0]), "page": key[1] + 1}
+
+        return {
+            "pages_checked": self.checked,
+            "blank": [label(k) for k in self.blank],
+            "duplicates": [
+                {**label(k), "duplicate_of": label(orig)}
+                for k, orig in self.duplicates
+            ]
+        }
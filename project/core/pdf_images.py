@@ -1,14 +1,435 @@
+import ctypes
+
 import fitz
 import numpy as np
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+from core.document import DocumentSource, open_document
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """
+    How PDF pages are rasterized for OCR.
+
+    Attributes:
+        dpi: Nominal rendering resolution
+        max_side: Pixel budget for the longest image side (None = no cap).
+            Large pages are rendered straight at the reduced size rather than
+            rendered at `dpi` and downscaled afterwards.
+        use_embedded: For pages that are a single full-page scan, decode the
+            embedded image at its native resolution instead of rendering
+        grayscale: Rasterize to a single gray channel where that is cheaper
+            (scans and text/vector pages); the model input is expanded to
+            three channels only after any downscaling
+        crop: Rasterize only the region of the page that has content, so a
+            small card on an empty page gets the whole pixel budget
+        crop_margin: Blank border kept around the content, in PDF points
+        tile: Render oversized pages at the full `dpi` and OCR them in
+            overlapping tiles of at most `max_side` pixels instead of
+            shrinking them to fit (see core.ocr_tiling). At 300 DPI that
+            already covers A4 (3508 px tall), so it costs extra inference
+            and is meant for documents with small print
+        tile_overlap: Minimum overlap between neighbouring tiles, in pixels;
+            should exceed the height of a text line
+    """
+
+    dpi: int = 300
+    max_side: Optional[int] = 2500
+    use_embedded: bool = True
+    grayscale: bool = False
+    crop: bool = False
+    crop_margin: float = 18.0
+    tile: bool = False
+    tile_overlap: int = 200
+
+
+DEFAULT_RENDER_OPTIONS = RenderOptions()
+
+
+def page_zoom(page, dpi=300, max_side=None) -> float:
+    """
+    Zoom factor (pixels per PDF point) that renders `page` at `dpi`
+    without its longest side exceeding `max_side` pixels.
+    """
+    zoom = dpi / 72
+    if max_side:
+        longest = max(page.rect.width, page.rect.height)
+        if longest * zoom > max_side:
+            zoom = max_side / longest
+    return zoom
+
+
+def render_pixmap(page, dpi=300, max_side=None, **kwargs):
+    """Rasterize a page directly at its final size."""
+    zoom = page_zoom(page, dpi, max_side)
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), **kwargs)
+
+
+def _orient_image(img, transform, rotation):
+    """
+    Turn decoded image pixels into the orientation they have on the page.
+
+    `transform` maps the image's unit square onto the (unrotated) page, so
+    the signs of its linear part tell which way each image axis runs.
+    `rotation` is the page's /Rotate, applied on top for display.
+    """
+    a, b, c, d = transform[:4]
+
+    if abs(a) >= abs(b):
+        # Image x runs along page x
+        if a < 0:
+            img = img[:, ::-1]
+        if d < 0:
+            img = img[::-1]
+    else:
+        # Image x runs along page y: swap axes, then fix the directions
+        img = np.swapaxes(img, 0, 1)
+        if b < 0:
+            img = img[::-1]
+        if c < 0:
+            img = img[:, ::-1]
+
+    if rotation:
+        img = np.rot90(img, k=-(rotation // 90))
+
+    return np.ascontiguousarray(img)
+
+
+def _pixmap_to_array(pix):
+    """
+    Zero-copy view of a pixmap's samples: (h, w) for gray, (h, w, n) otherwise.
+
+    The view keeps the pixmap alive, so the MuPDF buffer can't be freed
+    while the array is still in use.
+    """
+    buf = (ctypes.c_ubyte * (pix.stride * pix.height)).from_address(pix.samples_ptr)
+    buf._pixmap = pix
+
+    img = np.frombuffer(buf, dtype=np.uint8).reshape(pix.height, pix.stride)
+    img = img[:, :pix.width * pix.n]
+    if pix.n == 1:
+        return img
+    return img.reshape(pix.height, pix.width, pix.n)
+
+
+def _to_gray(rgb):
+    # OpenCV is an order of magnitude faster than MuPDF's colour conversion
+    import cv2
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+
+
+def single_scan_info(page, min_coverage=0.9) -> Optional[dict]:
+    """
+    Image info (as from `page.get_image_info`) of the scan a page consists
+    of, or None for composite pages.
+
+    Only pages that are nothing but one image covering (almost) the whole
+    page qualify: no vector drawings, no visible text, no annotations.
+    """
+    infos = page.get_image_info(xrefs=True)
+    if len(infos) != 1 or not infos[0].get("xref"):
+        return None
+
+    info = infos[0]
+    page_rect = page.rect * page.derotation_matrix
+    bbox = fitz.Rect(info["bbox"])
+    if abs(bbox & page_rect) < min_coverage * abs(page_rect):
+        return None
+
+    if page.first_annot or page.get_drawings():
+        return None
+    # Text drawn in render mode 3 is an invisible OCR layer and doesn't count
+    if any(span["type"] != 3 for span in page.get_texttrace()):
+        return None
+    return info
+
+
+def embedded_page_image(page, min_coverage=0.9, grayscale=False):
+    """
+    Decode the scan behind a single-image page at its native resolution.
+
+    Returns:
+        RGB (or gray) array oriented as the page is displayed, or None for
+        composite pages that have to be rendered (see `single_scan_info`).
+    """
+    info = single_scan_info(page, min_coverage)
+    if info is None:
+        return None
+
+    try:
+        pix = fitz.Pixmap(page.parent, info["xref"])
+    except Exception:
+        return None
+
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if grayscale and pix.colorspace is not None and pix.colorspace.n == 1:
+        img = _pixmap_to_array(pix)
+    else:
+        if pix.colorspace is None or pix.colorspace.n != 3:
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        img = _pixmap_to_array(pix)
+        if grayscale:
+            img = _to_gray(img)
+
+    return _orient_image(img, info["transform"], page.rotation)
+
+
+def page_image(page, dpi=300, max_side=None, use_embedded=True, grayscale=False):
+    """
+    RGB image of a page: the embedded scan when the page is a plain scan,
+    otherwise a rendering at `dpi` capped to `max_side`.
+
+    With `grayscale`, embedded scans and pages without raster images come
+    back as a single gray channel; other pages stay RGB.
+
+    Embedded scans come back at native resolution; callers apply their own
+    size cap to them.
+    """
+    if use_embedded:
+        img = embedded_page_image(page, grayscale=grayscale)
+        if img is not None:
+            return img
+
+    # MuPDF converts raster images to gray slowly, and converting an RGB
+    # rendering afterwards costs more memory than it saves, so only text
+    # and vector pages are drawn straight into a one-channel pixmap
+    if grayscale and not page.get_images():
+        return _pixmap_to_array(render_pixmap(page, dpi, max_side, colorspace=fitz.csGRAY))
+
+    return _pixmap_to_array(render_pixmap(page, dpi, max_side))
+
+
+def ink_bbox(img, contrast=24, min_area=0.0025, side=512) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Pixel bounds (x0, y0, x1, y1) of the content of a page image, or None
+    when nothing stands out from the background.
+
+    Works on a copy downscaled to at most `side` px, so the cost doesn't
+    grow with the resolution; the bounds are scaled back to `img`. Ink is
+    merged into blobs; blobs smaller than `min_area` of the image (specks,
+    page numbers), hollow ones (frames, rules) and anything in a thin band
+    along the edges (scanner borders) are ignored.
+    """
+    import cv2
+
+    h, w = img.shape[:2]
+    scale = min(1.0, side / max(h, w))
+    small = img
+    if scale < 1.0:
+        small = cv2.resize(
+            img,
+            (max(1, round(w * scale)), max(1, round(h * scale))),
+            interpolation=cv2.INTER_AREA
+        )
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+
+    background = int(np.median(small))
+    ink = (np.abs(small.astype(np.int16) - background) > contrast).astype(np.uint8)
+    if not ink.any():
+        return None
+
+    # Scanner borders and shadows hug the image edges; leave them out
+    reach = max(3, max(small.shape) // 70) | 1
+    ink[:reach] = ink[-reach:] = 0
+    ink[:, :reach] = ink[:, -reach:] = 0
+
+    ink = cv2.dilate(ink, np.ones((reach, reach), np.uint8))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+
+    sh, sw = small.shape[:2]
+    x, y, bw, bh, area = stats[1:].T
+    # Real content makes dense blobs; frames and long rules are mostly hollow
+    keep = (area >= min_area * small.size) & (area >= 0.3 * bw * bh)
+    if not keep.any():
+        return None
+
+    # Undo the dilation at the outer bounds
+    pad = reach // 2
+    x0 = max(0, x[keep].min() + pad)
+    y0 = max(0, y[keep].min() + pad)
+    x1 = min(sw, (x + bw)[keep].max() - pad)
+    y1 = min(sh, (y + bh)[keep].max() - pad)
+
+    sx = w / sw
+    sy = h / sh
+    return (
+        int(x0 * sx),
+        int(y0 * sy),
+        min(w, int(np.ceil(x1 * sx))),
+        min(h, int(np.ceil(y1 * sy)))
+    )
+
+
+def _content_clip(bounds, size, area, margin, max_fill):
+    """
+    Map pixel `bounds` inside an image of `size` that shows `area` of the
+    page to a page rect, grown by `margin` points. None when cropping would
+    save too little to bother.
+    """
+    w, h = size
+    x0, y0, x1, y1 = bounds
+    sx = area.width / w
+    sy = area.height / h
+
+    clip = fitz.Rect(
+        area.x0 + x0 * sx - margin,
+        area.y0 + y0 * sy - margin,
+        area.x0 + x1 * sx + margin,
+        area.y0 + y1 * sy + margin
+    ) & area
+
+    if clip.is_empty or abs(clip) > max_fill * abs(area):
+        return None
+    return clip
+
+
+def page_region_image(
+    page,
+    dpi=300,
+    max_side=None,
+    use_embedded=True,
+    grayscale=False,
+    crop=False,
+    margin=18.0,
+    max_fill=0.9
+):
+    """
+    Like `page_image`, but optionally cropped to the page's content.
+
+    Returns:
+        (image, rect) where rect is the fitz.Rect of the page, in displayed
+        page coordinates (points), that the image covers. Without cropping,
+        or when the content fills more than `max_fill` of the page, rect is
+        the whole page.
+    """
+    if not crop:
+        return page_image(page, dpi, max_side, use_embedded, grayscale), page.rect
+
+    if use_embedded:
+        img = embedded_page_image(page, grayscale=grayscale)
+        if img is not None:
+            # The scan covers (almost) the whole page; crop the decoded pixels
+            area = fitz.Rect(page.get_image_info()[0]["bbox"]) * page.rotation_matrix
+            h, w = img.shape[:2]
+            bounds = ink_bbox(img)
+            clip = bounds and _content_clip(bounds, (w, h), area, margin, max_fill)
+            if not clip:
+                return img, area
+
+            sx = w / area.width
+            sy = h / area.height
+            x0 = max(0, int((clip.x0 - area.x0) * sx))
+            y0 = max(0, int((clip.y0 - area.y0) * sy))
+            x1 = min(w, int(np.ceil((clip.x1 - area.x0) * sx)))
+            y1 = min(h, int(np.ceil((clip.y1 - area.y0) * sy)))
+            rect = fitz.Rect(
+                area.x0 + x0 / sx, area.y0 + y0 / sy,
+                area.x0 + x1 / sx, area.y0 + y1 / sy
+            )
+            return np.ascontiguousarray(img[y0:y1, x0:x1]), rect
+
+    # Find the content on a cheap low-resolution rendering first
+    thumb_zoom = 512 / max(page.rect.width, page.rect.height)
+    thumb = _pixmap_to_array(page.get_pixmap(matrix=fitz.Matrix(thumb_zoom, thumb_zoom)))
+    bounds = ink_bbox(thumb)
+    clip = bounds and _content_clip(
+        bounds, (thumb.shape[1], thumb.shape[0]), page.rect, margin, max_fill
+    )
+    if not clip:
+        return page_image(page, dpi, max_side, False, grayscale), page.rect
+
+    # The pixel budget now applies to the clip alone
+    zoom = dpi / 72
+    if max_side and max(clip.width, clip.height) * zoom > max_side:
+        zoom = max_side / max(clip.width, clip.height)
+
+    kwargs = {}
+    if grayscale and not page.get_images():
+        kwargs["colorspace"] = fitz.csGRAY
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, **kwargs)
+    return _pixmap_to_array(pix), clip
+
+
+def _buffer_view(out, shape):
+    """Contiguous array of `shape` over the start of the buffer `out`."""
+    size = int(np.prod(shape))
+    if out.dtype != np.uint8 or not out.flags.c_contiguous:
+        raise ValueError("Image buffer must be a C-contiguous uint8 array")
+    if out.size < size:
+        raise ValueError(
+            f"Image buffer holds {out.size} bytes, page needs {size} ({'x'.join(map(str, shape))})"
+        )
+    return out.reshape(-1)[:size].reshape(shape)
+
+
+def iter_pdf_images(
+    source: DocumentSource,
+    dpi=300,
+    max_side=None,
+    use_embedded=True,
+    grayscale=False,
+    out: Optional[np.ndarray] = None
+) -> Iterator[np.ndarray]:
+    """
+    Page images of a PDF, one at a time.
+
+    Only the current page is held in memory, so memory stays flat however
+    long the document is. Unlike `page_image`, embedded scans are also
+    brought down to `dpi` and `max_side`, and with `grayscale` every page
+    comes back as a single gray channel (RGB otherwise).
+
+    Args:
+        source: Path to the PDF, or an open DocumentSession
+        dpi: Rendering resolution
+        max_side: Pixel budget for the longest image side (None = no cap)
+        use_embedded: Decode single-scan pages at their native resolution
+        grayscale: Yield (h, w) gray images instead of (h, w, 3) RGB
+        out: Optional reusable uint8 buffer. Each image is written to the
+            start of it and yielded as a view, so MuPDF's pixmap is freed
+            straight away; the view is only valid until the next page.
+            np.empty(max_side * max_side * 3, np.uint8) fits any page.
+
+    Yields:
+        One image per page, in page order.
+
+    Raises:
+        ValueError: When a page doesn't fit in `out`.
+    """
+    import cv2
+
+    with open_document(source) as session:
+        for page in session.pages():
+            img = page_image(page, dpi, max_side, use_embedded, grayscale)
+            if grayscale and img.ndim == 3:
+                img = _to_gray(img)
+
+            # Embedded scans are decoded at native resolution; bring them down
+            # to `dpi` too (with a pixel of slack so renderings aren't touched)
+            limit = int(max(page.rect.width, page.rect.height) * dpi / 72) + 1
+            if max_side:
+                limit = min(limit, max_side)
+
+            h, w = img.shape[:2]
+            scale = min(1.0, limit / max(h, w))
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            shape = (size[1], size[0]) + img.shape[2:]
+
+            dst = _buffer_view(out, shape) if out is not None else None
+            if scale < 1.0:
+                img = cv2.resize(img, size, dst=dst, interpolation=cv2.INTER_AREA)
+            elif dst is not None:
+                np.copyto(dst, img)
+                img = dst
 
-def pdf_to_images(pdf_path, dpi=300):
-    doc = fitz.open(pdf_path)
-    images = []
+            yield img
+            # Drop the pixmap (or decoded scan) before rendering the next page
+            del img
 
-    for page in doc:
-        pix = page.get_pixmap(dpi=dpi)
-        img = np.frombuffer(pix.samples, dtype=np.uint8)
-        img = img.reshape(pix.height, pix.width, pix.n)
-        images.append(img)
 
-    return images
+def pdf_to_images(source: DocumentSource, dpi=300, max_side=None, use_embedded=True):
+    """All page images of a PDF as a list; see `iter_pdf_images`."""
+    return list(iter_pdf_images(source, dpi, max_side, use_embedded))
@@ -1,16 +1,17 @@
-import fitz  # PyMuPDF
+from core.document import DocumentSource, open_document
 
 
-def extract_pdf_text(pdf_path):
-    doc = fitz.open(pdf_path)
-    pages = []
+def iter_pdf_text(source: DocumentSource):
+    """Yield the text layer of each page as soon as it is extracted."""
+    with open_document(source) as session:
+        for page_index in range(len(session)):
+            text = session.page_text(page_index)
 
-    for page in doc:
-        text = page.get_text("text")
+            yield {
+                "page": page_index + 1,
+                "text": text.strip()
+            }
 
-        pages.append({
-            "page": page.number + 1,
-            "text": text.strip()
-        })
 
-    return pages
+def extract_pdf_text(source: DocumentSource):
+    return list(iter_pdf_text(source))
@@ -0,0 +1,239 @@
+"""
+Template-Anchored Region OCR
+
+Fixed-layout forms don't need full-page, full-resolution OCR. A quick
+low-resolution pass finds the printed field labels (anchors); the value
+next to each label is then rendered and recognized on its own at full
+resolution. Currently covers the GST REG-06 registration certificate.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+from core.document import DocumentSource, open_document
+from core.ocr_engine import OCRConfig, recognize, render_page
+from core.ocr_result import OCRLines
+from core.pdf_images import RenderOptions
+
+
+@dataclass(frozen=True)
+class ROIField:
+    """
+    One labelled field of a form.
+
+    Attributes:
+        field: Result key the value is stored under
+        anchor: Regex (case-insensitive) matching the label's OCR line
+        inline: The value is printed on the label's own line
+            ("Registration Number :24AB..."), so the region is that line
+    """
+
+    field: str
+    anchor: str
+    inline: bool = False
+
+
+GST_REG06_FIELDS: Tuple[ROIField, ...] = (
+    ROIField("gst_number", r"registration\s*n[uo]mber|\bgstin\b", inline=True),
+    ROIField("name", r"^\W*(?:\d+\W*)?legal\s*name"),
+    ROIField("constitution_of_business", r"constitution\s*of\s*bus"),
+    ROIField("principal_address", r"address\s*of\s*principal|principal\s*place"),
+    ROIField("particulars_of_approving_authority", r"particulars\s*of\s*approv"),
+)
+
+
+def _match_anchor(lines: OCRLines, spec: ROIField) -> Optional[int]:
+    pattern = re.compile(spec.anchor, re.IGNORECASE)
+    for i, text in enumerate(lines.texts):
+        if pattern.search(text.strip()):
+            return i
+    return None
+
+
+def _label_block(lines: OCRLines, anchor: int) -> Tuple[np.ndarray, Optional[float]]:
+    """
+    Box of a (possibly wrapped) label and the top of the next row's label.
+
+    Lines starting at the label's left edge continue the label while they
+    follow it closely; the first one further down starts the next row.
+    """
+    boxes = lines.boxes
+    box = boxes[anchor].copy()
+    height = box[3] - box[1]
+
+    same_column = np.abs(boxes[:, 0] - box[0]) < 2 * height
+    below = np.flatnonzero(same_column & (boxes[:, 1] > box[1] + height / 2))
+    for i in below[np.argsort(boxes[below, 1])]:
+        if boxes[i, 1] - box[3] < 0.35 * height:
+            box[2] = max(box[2], boxes[i, 2])
+            box[3] = max(box[3], boxes[i, 3])
+        else:
+            return box, float(boxes[i, 1])
+    return box, None
+
+
+def value_regions(
+    lines: OCRLines,
+    page_rect,
+    fields: Tuple[ROIField, ...] = GST_REG06_FIELDS
+) -> Dict[str, fitz.Rect]:
+    """
+    Locate the value region of each field from a low-resolution pass.
+
+    Args:
+        lines: Lines of the low-resolution pass, in page points
+        page_rect: Displayed page rect
+        fields: Form description
+
+    Returns:
+        Field name -> page rect of its value; fields whose label wasn't
+        found are left out.
+    """
+    regions = {}
+    if not len(lines):
+        return regions
+
+    right = min(page_rect.x1, float(lines.boxes[:, 2].max()) + 12)
+
+    for spec in fields:
+        anchor = _match_anchor(lines, spec)
+        if anchor is None:
+            continue
+
+        box = lines.boxes[anchor]
+        height = box[3] - box[1]
+        pad = 0.4 * height
+
+        if spec.inline:
+            clip = fitz.Rect(box[0] - pad, box[1] - pad, right, box[3] + pad)
+        else:
+            label, next_row = _label_block(lines, anchor)
+            bottom = next_row - pad if next_row is not None else label[3] + 4 * height
+            top = label[1] - pad
+
+            # The value column starts with the first text right of the label
+            boxes = lines.boxes
+            in_row = (boxes[:, 1] < bottom) & (boxes[:, 3] > top) & (boxes[:, 0] > label[2])
+            left = float(boxes[in_row, 0].min()) - pad if in_row.any() else label[2] + pad
+            clip = fitz.Rect(left, top, right, bottom)
+
+        clip &= page_rect
+        if not clip.is_empty:
+            regions[spec.field] = clip
+
+    return regions
+
+
+def _render_region(page, clip, dpi):
+    zoom = dpi / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip)
+    rgb = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+
+def _region_text(lines: OCRLines, min_score: float = 0.25) -> str:
+    """Lines of a region in reading order, one per text row."""
+    lines = lines.filter(min_score)
+    if not len(lines):
+        return ""
+
+    heights = lines.boxes[:, 3] - lines.boxes[:, 1]
+    rows = np.round(lines.boxes[:, 1] / max(float(np.median(heights)), 1.0))
+    order = np.lexsort((lines.boxes[:, 0], rows))
+
+    out: List[str] = []
+    last_row = None
+    for i in order:
+        if rows[i] == last_row:
+            out[-1] += " " + lines.texts[i]
+        else:
+            out.append(lines.texts[i])
+            last_row = rows[i]
+    return "\n".join(out)
+
+
+def ocr_form_regions(
+    session,
+    page_index: int = 0,
+    fields: Tuple[ROIField, ...] = GST_REG06_FIELDS,
+    config: Optional[OCRConfig] = None,
+    cache=None,
+    anchor_dpi: int = 120,
+    value_dpi: int = 300
+) -> Tuple[Dict[str, str], str]:
+    """
+    Read the labelled fields of a form page region by region.
+
+    Args:
+        session: Open DocumentSession
+        page_index: 0-based page holding the fields
+        fields: Form description
+        config: Model configuration
+        cache: Optional OCRCache
+        anchor_dpi: Resolution of the pass that finds the labels
+        value_dpi: Resolution the value regions are recognized at
+
+    Returns:
+        (values, anchor_text): field name -> recognized value text, and the
+        text of the low-resolution pass for fallback heuristics.
+    """
+    page = session.page(page_index)
+
+    img, rect = render_page(page, RenderOptions(dpi=anchor_dpi, max_side=None))
+    found = recognize([img], config, cache)[0]
+    if found is None:
+        return {}, ""
+
+    h, w = img.shape[:2]
+    found = found.filter(min_score=-1.0).mapped(rect.width / w, rect.height / h, rect.x0, rect.y0)
+
+    regions = value_regions(found, page.rect, fields)
+    if not regions:
+        return {}, found.text()
+
+    names = list(regions)
+    crops = [_render_region(page, regions[name], value_dpi) for name in names]
+    results = recognize(crops, config, cache)
+
+    values = {
+        name: _region_text(result)
+        for name, result in zip(names, results)
+        if result is not None
+    }
+    return values, found.text()
+
+
+def extract_gst_roi(source: DocumentSource, **ocr_options) -> Dict:
+    """
+    GST certificate extraction with region OCR on the certificate page.
+
+    Page 1 is read through `ocr_form_regions`; the other pages (Annexure A
+    and B) go through the usual text-layer/OCR path, and fields the regions
+    didn't yield fall back to the text heuristics. Documents whose first
+    page has a usable text layer need no OCR and take the regular path.
+
+    Returns:
+        Output of `extract_gst_certificate_fields`.
+    """
+    from core.extractor import is_text_usable, iter_document_text
+    from core.extractors.gst_certi import extract_gst_certificate_fields
+
+    region_options = {k: ocr_options[k] for k in ("config", "cache") if k in ocr_options}
+
+    with open_document(source) as session:
+        if is_text_usable(session.page_text(0)):
+            texts = [page["text"] for page in iter_document_text(session, **ocr_options)]
+            return extract_gst_certificate_fields(" ".join(texts))
+
+        values, first_text = ocr_form_regions(session, 0, **region_options)
+
+        texts = [first_text]
+        rest = range(1, len(session))
+        texts += [page["text"] for page in iter_document_text(session, pages=rest, **ocr_options)]
+
+    return extract_gst_certificate_fields(" ".join(texts), region_values=values)
@@ -1,13 +1,10 @@
 import json
-from core.extractor import extract_document_text
+from core.extractor import run_extraction
 from core.extractors.pan_company_final import extract_pan_company_fields
 
 
 def run_pan_extraction(pdf_path: str):
-    pages = extract_document_text(pdf_path)
-    raw_text = " ".join(page["text"] for page in pages)
-
-    result = extract_pan_company_fields(raw_text)
+    result = run_extraction(pdf_path, extract_pan_company_fields, dpi_policy="pan")
     return result
 
 
@@ -1,6 +1,7 @@
 import json
-from core.extractor import extract_document_text
-from core.extractors.gst_certi import extract_gst_certificate_fields
+from core.extractor import run_extraction
+from core.extractors.gst_certi import REQUIRED_FIELDS, extract_gst_certificate_fields
+from core.roi_ocr import extract_gst_roi
 
 import os
 os.environ["FLAGS_use_onednn"] = "false"
@@ -14,13 +15,22 @@ def inference():
 start = time.perf_counter()
 result = inference()
 
-def run_pan_extraction(pdf_path: str):
-    pages = extract_document_text(pdf_path)
-    raw_text = " ".join(page["text"] for page in pages)
+def run_pan_extraction(pdf_path: str, roi: bool = False, with_tables: bool = True):
     output_dir = r"C:\Users\Tirth\OneDrive\Documents\codes\ocr\OCR-automation-system\project\output"
 
     output_path = os.path.join(output_dir, f"gst_output.json")
-    result = extract_gst_certificate_fields(raw_text)
+    if roi:
+        # Anchor pass + value regions instead of full-page OCR of page 1
+        result = extract_gst_roi(pdf_path)
+    else:
+        # Annexure A (additional places of business) is a table page
+        result = run_extraction(
+            pdf_path,
+            extract_gst_certificate_fields,
+            dpi_policy="gst",
+            required_fields=REQUIRED_FIELDS,
+            with_tables=with_tables
+        )
     # raw = run_pan_extraction(pdf_path)
     # print(raw)
     # Save to JSON file
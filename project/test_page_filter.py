@@ -0,0 +1,92 @@
+"""
+Regression checks for the pre-OCR page filter.
+
+Pages of one form template with different data must never be treated as
+duplicates of each other, and a sparse page must not be skipped as blank.
+
+Usage:
+    python test_page_filter.py
+"""
+
+import os
+import tempfile
+
+import fitz  # PyMuPDF
+
+from core.document import DocumentSession
+from core.page_filter import BLANK, DUPLICATE, OCR, PageFilter
+
+
+def _pan_card(path, name, pan):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.draw_rect(fitz.Rect(60, 60, 535, 300), color=(0, 0, 0), width=1.5)
+    page.insert_text((80, 100), "INCOME TAX DEPARTMENT", fontsize=16)
+    page.insert_text((80, 150), "Name", fontsize=10)
+    page.insert_text((80, 170), name, fontsize=14)
+    page.insert_text((80, 220), "Permanent Account Number", fontsize=10)
+    page.insert_text((80, 240), pan, fontsize=14)
+    doc.save(path)
+
+
+def _verdicts(page_filter, path):
+    with DocumentSession(path) as session:
+        return [page_filter.classify(session, i) for i in range(len(session))]
+
+
+def test_same_template_different_data():
+    with tempfile.TemporaryDirectory() as tmp:
+        a, b, copy = (os.path.join(tmp, f"{n}.pdf") for n in ("a", "b", "copy"))
+        _pan_card(a, "RAMESH KUMAR PATEL", "ABCDE1234F")
+        _pan_card(b, "SURESH KUMAR SHAH", "PQRSX9876K")
+        _pan_card(copy, "RAMESH KUMAR PATEL", "ABCDE1234F")
+
+        page_filter = PageFilter()
+        assert _verdicts(page_filter, a)[0].kind == OCR
+        assert _verdicts(page_filter, b)[0].kind == OCR
+
+        verdict = _verdicts(page_filter, copy)[0]
+        assert verdict.kind == DUPLICATE
+        assert verdict.duplicate_of == (os.path.abspath(a), 0)
+
+
+def test_page_with_more_lines_is_not_duplicate():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "register.pdf")
+        doc = fitz.open()
+        for count in (3, 6):
+            page = doc.new_page()
+            for i in range(count):
+                page.insert_text((72, 100 + 30 * i), f"Line {i + 1}: register entry", fontsize=11)
+        doc.save(path)
+
+        assert [v.kind for v in _verdicts(PageFilter(), path)] == [OCR, OCR]
+
+
+def test_page_is_never_its_own_duplicate():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "a.pdf")
+        _pan_card(path, "RAMESH KUMAR PATEL", "ABCDE1234F")
+
+        page_filter = PageFilter()
+        _verdicts(page_filter, path)
+        assert _verdicts(page_filter, path)[0].kind == OCR
+
+
+def test_sparse_page_is_not_blank():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sparse.pdf")
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((72, 400), "UDYAM-GJ-01-0012345 Enterprise: SHREEDHAR ENTERPRISE", fontsize=11)
+        doc.new_page()
+        doc.save(path)
+
+        assert [v.kind for v in _verdicts(PageFilter(), path)] == [OCR, BLANK]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
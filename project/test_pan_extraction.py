@@ -1,6 +1,6 @@
 import json
-from core.extractor import extract_document_text
-from core.extractors.pan_card import extract_pan_company_fields
+from core.extractor import run_extraction
+from core.extractors.pan_card import REQUIRED_FIELDS, extract_pan_company_fields
 
 import os
 os.environ["FLAGS_use_onednn"] = "false"
@@ -15,12 +15,12 @@ start = time.perf_counter()
 result = inference()
 
 def run_pan_extraction(pdf_path: str):
-    pages = extract_document_text(pdf_path)
-    raw_text = " ".join(page["text"] for page in pages)
     output_dir = r"C:\Users\Tirth\OneDrive\Documents\codes\ocr\OCR-automation-system\project\output"
 
     output_path = os.path.join(output_dir, f"pan_output.json")
-    result = extract_pan_company_fields(raw_text)
+    result = run_extraction(
+        pdf_path, extract_pan_company_fields, dpi_policy="pan", required_fields=REQUIRED_FIELDS
+    )
     # raw = run_pan_extraction(pdf_path)
     # print(raw)
     # Save to JSON file
@@ -2,18 +2,21 @@
  
 import json
 import os
-from core.extractor import extract_document_text
-from core.extractors.udhyam_certi import extract_udyam_fields
+from core.extractor import run_extraction
+from core.extractors.udhyam_certi import REQUIRED_FIELDS, extract_udyam_fields
 
 
-def run_udyam_extraction(pdf_path: str, output_dir: str = "output"):
+def run_udyam_extraction(pdf_path: str, output_dir: str = "output", with_tables: bool = False):
     """Extract Udyam certificate data from PDF and save to JSON."""
-    # Extract text from PDF
-    pages = extract_document_text(pdf_path)
-    raw_text = " ".join(page["text"] for page in pages)
-    
-    # Extract structured data
-    result = extract_udyam_fields(raw_text)
+    # Extract structured data, streaming page text into the extractor;
+    # pages after the first are only read when their fields or tables are wanted
+    result = run_extraction(
+        pdf_path,
+        extract_udyam_fields,
+        dpi_policy="udyam",
+        required_fields=REQUIRED_FIELDS,
+        with_tables=with_tables
+    )
     output_dir = r"C:\Users\Tirth\OneDrive\Documents\codes\ocr\OCR-automation-system\project\output"
     
     # Generate filename from PDF
@@ -33,7 +36,7 @@ if __name__ == "__main__":
     # UDYAM_PDF_PATH = r"C:\Users\Tirth\OneDrive\Documents\codes\ocr\testing_data\SHREEDHAR ENTERPRISE\Print  Udyam Registration Certificate.PDF"
     
     # Extract and save JSON
-    result, json_path = run_udyam_extraction(UDYAM_PDF_PATH)
+    result, json_path = run_udyam_extraction(UDYAM_PDF_PATH, with_tables=True)
     
     # Optional: Print summary
     print("\n📋 Extraction Summary:")
@@ -0,0 +1,51 @@
+"""
+Calibrate OCR runtime settings for this host.
+
+Times OCR of sample pages from testing_data under different intra-op
+thread counts, oneDNN on/off, recognition batch sizes and render sizes,
+and saves the fastest combination whose mean line confidence stays above
+the floor. The engine loads the saved settings automatically
+(see core/ocr_tuning.py); delete the file to go back to the defaults.
+
+Usage:
+    python tune_ocr.py [pdf_dir] [--pages 6] [--repeats 1]
+                       [--min-confidence 0.85] [--output path] [--dry-run]
+"""
+
+import argparse
+import os
+
+from core.ocr_tuning import calibrate, save_tuned_settings, tuning_path
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf_dir", nargs="?", default=os.path.join(here, "..", "testing_data"))
+    parser.add_argument("--pages", type=int, default=6, help="sample pages to time")
+    parser.add_argument("--repeats", type=int, default=1, help="timed passes per setting")
+    parser.add_argument("--min-confidence", type=float, default=0.85)
+    parser.add_argument(
+        "--output", default=None,
+        help=f"settings file (default {tuning_path()}; other paths load only via OCR_TUNING_FILE)"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="report without saving")
+    args = parser.parse_args()
+
+    settings = calibrate(
+        args.pdf_dir,
+        min_confidence=args.min_confidence,
+        max_pages=args.pages,
+        repeats=args.repeats
+    )
+    if args.dry_run:
+        print(settings.to_dict())
+        return
+
+    path = save_tuned_settings(settings, args.output)
+    print(f"✅ Settings saved to: {path}")
+
+
+if __name__ == "__main__":
+    main()